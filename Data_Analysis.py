@@ -3,7 +3,16 @@ import plotly.express as px
 import pandas as pd
 import numpy as np
 from scipy import stats
-from utils.data_loader import load_data
+from utils.aggregates import load_day_grid, rolling_mean, rolling_on_time
+from utils.bootstrap import BOOTSTRAP_REPLICATES, CONFIDENCE, load_bootstrap_ci
+from utils.charts import pick_window, plot_chart
+from utils.data_loader import load_data, load_monthly, load_validation_report
+from utils.page_data import prepare_analysis
+from utils.risk import impact_levels, load_delay_risk
+from utils.sketches import load_column_sketches, load_group_sketches, sketch_box, sketch_violin
+from utils.metrics import finish_page, start_page
+
+start_page('Data_Analysis')
 
 # Page config
 st.set_page_config(
@@ -20,102 +29,114 @@ if delivery_data.empty or warehouse_data.empty or shift_data.empty:
     st.error("Failed to load required data")
     st.stop()
 
-# --- Fix: Ensure 'Date' columns are datetime ---
-for df in [delivery_data, warehouse_data, shift_data]:
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-
-# Drop rows with invalid dates
-delivery_data.dropna(subset=['Date'], inplace=True)
-warehouse_data.dropna(subset=['Date'], inplace=True)
-shift_data.dropna(subset=['Date'], inplace=True)
-
 # Data Processing
-# Calculate on-time rate
-delivery_data['On-Time Rate'] = (delivery_data['On-Time Deliveries'] / 
-                               (delivery_data['On-Time Deliveries'] + delivery_data['Delayed Deliveries'])) * 100
-
-# Add month column for time analysis
-delivery_data['Month'] = delivery_data['Date'].dt.to_period('M').astype(str)
-warehouse_data['Month'] = warehouse_data['Date'].dt.to_period('M').astype(str)
-shift_data['Month'] = shift_data['Date'].dt.to_period('M').astype(str)
-
-# Calculate utilization
-shift_data['Utilization'] = (1 - (shift_data['Idle Time (hours)'] / 8)) * 100  # Assuming 8-hour shifts
+# On-time rate, month columns and shift utilization, prepared the same way as the prefetch does
+delivery_data, warehouse_data, shift_data = prepare_analysis(delivery_data, warehouse_data, shift_data)
 
 # Page title
 st.title("📊 Performance Deep Dive")
 
+# Rows rejected by the loader's validation stage
+validation_report, quarantine = load_validation_report()
+failures = validation_report[validation_report['Rows'] > 0]
+with st.expander(f"Data Quality ({sum(len(rows) for rows in quarantine.values())} rows quarantined)"):
+    if failures.empty:
+        st.success("All rows passed validation")
+    else:
+        st.dataframe(failures, hide_index=True)
+        quarantined = [name for name, rows in quarantine.items() if not rows.empty]
+        if quarantined:
+            dataset = st.selectbox("Quarantined rows", options=quarantined)
+            st.dataframe(quarantine[dataset])
+
 # Tabs
 tab1, tab2, tab3, tab4 = st.tabs(["Delivery", "Warehouse", "Drivers", "Advanced Analytics"])
 
 # --- tab1 ---
 with tab1:
     st.header("Delivery Performance Analysis")
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
-        regional = delivery_data.groupby('Region').agg({
-            'On-Time Rate': ['mean', 'std', 'count']
-        }).reset_index()
-        regional.columns = ['Region', 'Mean', 'Std Dev', 'Count']
-        
+        regional = load_bootstrap_ci('regional_on_time', delivery_data, ['Region'], 'On-Time Rate')
+    
         groups = [delivery_data[delivery_data['Region'] == r]['On-Time Rate'] for r in regional['Region']]
         f_val, p_val = stats.f_oneway(*groups)
-        
+    
         fig1 = px.bar(
             regional,
             x='Region',
             y='Mean',
-            error_y='Std Dev',
+            error_y='Error Plus',
+            error_y_minus='Error Minus',
             title=f'On-Time Performance by Region (ANOVA p={p_val:.4f})',
             color='Mean',
             color_continuous_scale='RdYlGn'
         )
-        st.plotly_chart(fig1, use_container_width=True)
-        
+        plot_chart(fig1)
+    
         st.caption(f"ANOVA test {'does not show' if p_val > 0.05 else 'shows'} statistically significant differences between regions at p<0.05 level")
 
     with col2:
-        monthly = delivery_data.groupby(['Month', 'Region'])['On-Time Rate'].agg(['mean', 'std', 'count']).reset_index()
-        monthly['CI'] = 1.96 * monthly['std'] / np.sqrt(monthly['count'])  # 95% CI
-        
+        monthly = load_bootstrap_ci('monthly_on_time', delivery_data, ['Month', 'Region'], 'On-Time Rate')
+    
         fig2 = px.line(
             monthly,
             x='Month',
-            y='mean',
+            y='Mean',
             color='Region',
-            error_y='CI',
+            error_y='Error Plus',
+            error_y_minus='Error Minus',
             title='Monthly Trend with Confidence Intervals',
             markers=True,
-            labels={'mean': 'On-Time Rate (%)'}
+            labels={'Mean': 'On-Time Rate (%)'}
         )
-        st.plotly_chart(fig2, use_container_width=True)
+        plot_chart(fig2)
+    
+    st.caption(f"Error bars are {CONFIDENCE:.0%} BCa bootstrap intervals ({BOOTSTRAP_REPLICATES:,} resamples)")
+
+    # Daily on-time rate next to its trailing-window average
+    window = pick_window('delivery_window')
+    delivery_grid = load_day_grid('delivery', delivery_data, 'Region', ['On-Time Deliveries', 'Delayed Deliveries'])
+    first_day, last_day = delivery_grid.dates[0], delivery_grid.dates[-1]
+    daily_rate = rolling_on_time(delivery_grid, delivery_grid.keys, first_day, last_day, 1)
+    rolling_rate = rolling_on_time(delivery_grid, delivery_grid.keys, first_day, last_day, window)
+    fig_rolling = px.line(
+        rolling_rate,
+        x='Date',
+        y='Rolling On-Time Rate',
+        color='Region',
+        title=f'{window}-Day Rolling On-Time Rate by Region',
+        labels={'Rolling On-Time Rate': 'On-Time Rate (%)'}
+    )
+    fig_rolling.add_traces(
+        px.scatter(daily_rate.dropna(), x='Date', y='Rolling On-Time Rate', color='Region', opacity=0.25)
+        .update_traces(showlegend=False, marker_size=4)
+        .data
+    )
+    plot_chart(fig_rolling)
 
 # --- tab2 ---
 with tab2:
     st.header("Warehouse Efficiency Analysis")
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         numeric_cols = ['Average Load Time (mins)', 'Average Unload Time (mins)']
-        melted_data = warehouse_data[numeric_cols + ['Warehouse ID']].melt(id_vars=['Warehouse ID'])
-        
+    
         _, p_load = stats.shapiro(warehouse_data['Average Load Time (mins)'])
         _, p_unload = stats.shapiro(warehouse_data['Average Unload Time (mins)'])
-        
-        fig3 = px.box(
-            melted_data,
-            x='variable',
-            y='value',
+    
+        fig3 = sketch_box(
+            load_column_sketches('processing_times', warehouse_data, numeric_cols),
             title=f'Processing Time Distribution (Normality p-values: Load={p_load:.3f}, Unload={p_unload:.3f})',
-            color='variable',
-            labels={'value': 'Time (minutes)', 'variable': 'Process Type'}
+            x_label='Process Type',
+            y_label='Time (minutes)'
         )
-        st.plotly_chart(fig3, use_container_width=True)
-        
+        plot_chart(fig3)
+    
         interpretation = "Normally distributed" if p_load > 0.05 else "Not normally distributed"
         st.caption(f"Load times are {interpretation} (Shapiro-Wilk p={p_load:.3f})")
 
@@ -124,9 +145,9 @@ with tab2:
             'Average Load Time (mins)': 'mean',
             'Average Unload Time (mins)': 'mean'
         }).reset_index()
-        
+    
         corr = warehouse_data['Average Load Time (mins)'].corr(warehouse_data['Average Unload Time (mins)'])
-        
+    
         fig4 = px.scatter(
             warehouse_summary,
             x='Average Load Time (mins)',
@@ -136,32 +157,29 @@ with tab2:
             title=f'Warehouse Efficiency Comparison (Correlation: {corr:.2f})',
             trendline='ols'
         )
-        st.plotly_chart(fig4, use_container_width=True)
-        
+        plot_chart(fig4)
+    
         st.caption(f"Correlation between load and unload times: {corr:.2f}")
 
 # --- tab3 ---
 with tab3:
     st.header("Driver & Shift Performance")
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         day_shift = shift_data[shift_data['Shift Type'] == 'Day Shift']['Average Deliveries per Shift']
         night_shift = shift_data[shift_data['Shift Type'] == 'Night Shift']['Average Deliveries per Shift']
         t_val, p_val = stats.ttest_ind(day_shift, night_shift, equal_var=False)
-        
-        fig5 = px.violin(
-            shift_data,
-            x='Shift Type',
-            y='Average Deliveries per Shift',
-            box=True,
-            points="all",
+    
+        fig5 = sketch_violin(
+            load_group_sketches('shift_productivity', shift_data, 'Shift Type', 'Average Deliveries per Shift'),
             title=f'Productivity by Shift Type (t-test p={p_val:.4f})',
-            color='Shift Type'
+            x_label='Shift Type',
+            y_label='Average Deliveries per Shift'
         )
-        st.plotly_chart(fig5, use_container_width=True)
-        
+        plot_chart(fig5)
+    
         st.caption(f"T-test {'does not show' if p_val > 0.05 else 'shows'} statistically significant difference between shifts at p<0.05 level")
 
     with col2:
@@ -175,34 +193,56 @@ with tab3:
             size='Idle Time (hours)',
             labels={'Average Deliveries per Shift': 'Productivity', 'Idle Time (hours)': 'Idle Time (hrs)'}
         )
-        
+    
         results = px.get_trendline_results(fig6)
         r_squared = results.iloc[0]["px_fit_results"].rsquared
-        
+    
         fig6.update_layout(
             title=f'Idle Time Impact on Productivity (R²={r_squared:.2f})'
         )
-        st.plotly_chart(fig6, use_container_width=True)
-        
+        plot_chart(fig6)
+    
         st.caption(f"Idle time explains {r_squared*100:.1f}% of productivity variation")
 
+    # Daily deliveries per shift type next to their trailing-window average
+    shift_window = pick_window('shift_window')
+    shift_grid = load_day_grid('shift', shift_data, 'Shift Type', ['Average Deliveries per Shift'])
+    first_day, last_day = shift_grid.dates[0], shift_grid.dates[-1]
+    daily_shift = rolling_mean(shift_grid, 'Average Deliveries per Shift', shift_grid.keys, first_day, last_day, 1)
+    rolling_shift = rolling_mean(shift_grid, 'Average Deliveries per Shift', shift_grid.keys, first_day, last_day, shift_window)
+    fig_shift = px.line(
+        rolling_shift,
+        x='Date',
+        y='Rolling Average Deliveries per Shift',
+        color='Shift Type',
+        title=f'{shift_window}-Day Rolling Deliveries per Shift',
+        labels={'Rolling Average Deliveries per Shift': 'Deliveries per Shift'}
+    )
+    fig_shift.add_traces(
+        px.scatter(daily_shift.dropna(), x='Date', y='Rolling Average Deliveries per Shift', color='Shift Type', opacity=0.25)
+        .update_traces(showlegend=False, marker_size=4)
+        .data
+    )
+    plot_chart(fig_shift)
+
 # --- tab4 ---
 with tab4:
     st.header("Advanced Analytics")
-    
+
     st.subheader("Delivery Delay Predictors")
     st.write("**Correlation Analysis**")
-    
-    warehouse_monthly = warehouse_data.groupby(['Warehouse ID', 'Month']).agg({
+
+    # Monthly rollups, computed one month partition at a time
+    warehouse_monthly = load_monthly('warehouse', ['Warehouse ID'], {
         'Average Load Time (mins)': 'mean',
         'Average Unload Time (mins)': 'mean'
-    }).reset_index()
-    
-    delivery_monthly = delivery_data.groupby(['Region', 'Month']).agg({
+    })
+
+    delivery_monthly = load_monthly('delivery', ['Region'], {
         'On-Time Rate': 'mean',
         'Delayed Deliveries': 'sum'
-    }).reset_index()
-    
+    })
+
     analysis_df = pd.merge(
         delivery_monthly,
         warehouse_monthly,
@@ -210,10 +250,10 @@ with tab4:
         right_on=['Month'],
         how='left'
     )
-    
+
     numeric_df = analysis_df.select_dtypes(include=[np.number])
     corr_matrix = numeric_df.corr()
-    
+
     fig7 = px.imshow(
         corr_matrix,
         text_auto=True,
@@ -221,39 +261,34 @@ with tab4:
         color_continuous_scale='RdBu',
         title='Correlation Matrix of Key Metrics'
     )
-    st.plotly_chart(fig7, use_container_width=True)
-    
+    plot_chart(fig7)
+
     st.subheader("Capacity Utilization Analysis")
-    
-    shift_data['Theoretical Capacity'] = shift_data['Average Deliveries per Shift'] / (1 - (shift_data['Idle Time (hours)'] / 8))
-    shift_data['Utilization %'] = (shift_data['Average Deliveries per Shift'] / shift_data['Theoretical Capacity']) * 100
-    
-    fig8 = px.box(
-        shift_data,
-        x='Shift Type',
-        y='Utilization %',
-        color='Shift Type',
+
+    fig8 = sketch_box(
+        load_group_sketches('shift_utilization', shift_data, 'Shift Type', 'Utilization %'),
         title='Shift Capacity Utilization',
-        points='all'
+        x_label='Shift Type',
+        y_label='Utilization %'
     )
-    st.plotly_chart(fig8, use_container_width=True)
-    
+    plot_chart(fig8)
+
     st.subheader("Predictive Insights")
     st.write("**Delivery Delay Risk Prediction**")
-    
-    risk_factors = pd.DataFrame({
-        'Factor': ['Warehouse Load Time', 'Night Shift Percentage', 'Peak Season', 'East Region'],
-        'Risk Score': [0.42, 0.38, 0.25, 0.55],
-        'Impact': ['High', 'Medium', 'Low', 'Very High']
-    })
-    
+
+    risk_model, risk_scores = load_delay_risk(delivery_data, warehouse_data, shift_data)
+    risk_factors = risk_model.contributions().rename_axis('Factor').reset_index()
+    # Absolute bands, so a weak model cannot label its largest factor "Very High"
+    risk_factors['Impact'] = impact_levels(risk_factors['Risk Score'])
+
     fig9 = px.bar(
         risk_factors.sort_values('Risk Score', ascending=True),
         x='Risk Score',
         y='Factor',
         color='Impact',
         orientation='h',
-        title='Top Delay Risk Factors',
+        title=f'Top Delay Risk Factors (R²={risk_model.r_squared:.3f})',
+        labels={'Risk Score': 'Delay rate change per std. dev. (pp)'},
         color_discrete_map={
             'Very High': '#d62728',
             'High': '#ff7f0e',
@@ -261,5 +296,21 @@ with tab4:
             'Low': '#2ca02c'
         }
     )
-    st.plotly_chart(fig9, use_container_width=True)
+    plot_chart(fig9)
+    st.caption(
+        f"Weighted ridge regression on {len(risk_model.months)} months (R²={risk_model.r_squared:.3f}). "
+        f"Region factors are relative to the {risk_model.baseline} region."
+    )
+    if risk_model.r_squared < 0.1:
+        st.info(f"These factors explain only {risk_model.r_squared:.1%} of the variation in daily delay rates.")
+
+    fig10 = px.imshow(
+        risk_scores.pivot(index='Region', columns='Month', values='Predicted Delay Rate'),
+        aspect="auto",
+        color_continuous_scale='Reds',
+        labels={'color': 'Predicted Delay Rate (%)'},
+        title='Predicted Delay Risk by Region and Month'
+    )
+    plot_chart(fig10)
 
+finish_page()
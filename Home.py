@@ -1,4 +1,8 @@
 import streamlit as st
+from utils.prefetch import start_prefetch
+from utils.metrics import finish_page, start_page
+
+start_page('Home')
 
 # MUST BE FIRST COMMAND
 st.set_page_config(
@@ -8,6 +12,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Compute the other pages' aggregates in the background while the user picks one
+start_prefetch()
+
 # Custom CSS (now comes after set_page_config)
 st.markdown("""
 <style>
@@ -74,3 +81,5 @@ st.markdown("""
     <p>Powered by Streamlit | Logistics Analytics Suite v2.0</p>
 </center>
 """, unsafe_allow_html=True)
+
+finish_page()
@@ -1,7 +1,21 @@
 import streamlit as st
 import plotly.express as px
+import os
+import numpy as np
 import pandas as pd
-from utils.data_loader import load_data
+from utils.charts import pick_window, plot_chart
+from utils.bitmap_index import load_range_index
+from utils.data_loader import load_data, load_partition_index
+from utils.export import EXPORT_FORMATS, export_url, remove_stale_exports, start_export
+from utils.pagination import PAGE_SIZES, load_range_table
+from utils.histograms import histogram_figure, load_warehouse_histograms
+from utils.aggregates import (
+    GRANULARITIES, load_day_grid, load_rate_series, on_time_trend, pick_granularity,
+    rolling_mean, rolling_on_time
+)
+from utils.metrics import finish_page, start_page, timed_fragment
+
+start_page('Interactive')
 
 # Page config must be first
 st.set_page_config(
@@ -10,6 +24,11 @@ st.set_page_config(
     layout="wide"
 )
 
+# Bins per processing-time histogram in the warehouse tab
+WAREHOUSE_HIST_BINS = 20
+# Seconds between progress updates while an export is written
+EXPORT_POLL_SECONDS = 0.5
+
 # Load data
 cost_data, delivery_data, warehouse_data, shift_data = load_data()
 
@@ -25,25 +44,51 @@ if not pd.api.types.is_datetime64_any_dtype(delivery_data['Date']):
 # Page title
 st.title("🔍 Interactive Data Explorer")
 
-# Tabs
-tab1, tab2 = st.tabs(["Delivery Analysis", "Warehouse Analysis"])
+def _clicked(chart_key):
+    """Entity clicked in a chart, read from the point's customdata"""
+    points = st.session_state[chart_key].selection.points
+    if not points:
+        return None
+    customdata = points[0].get('customdata')
+    return customdata[0] if customdata else points[0].get('label')
 
-with tab1:
+def _focus_region():
+    st.session_state.region_focus = _clicked('region_pie')
+
+def _focus_month():
+    points = st.session_state['trend_chart'].selection.points
+    st.session_state.month_focus = str(pd.Timestamp(points[0]['x']).to_period('M')) if points else None
+
+def _clear_focus():
+    st.session_state.region_focus = None
+    st.session_state.month_focus = None
+
+def _focus_warehouse():
+    warehouse = _clicked('warehouse_scatter')
+    if warehouse is not None:
+        st.session_state.warehouse_select = warehouse
+
+# Each tab is a fragment: its widgets rerun only that tab, and its inputs
+# are passed in explicitly rather than read from the page scope
+@st.fragment
+@timed_fragment
+def delivery_analysis(delivery_data, shift_data):
     # Region filter
     regions = st.multiselect(
         "Select Regions",
         options=delivery_data['Region'].unique(),
         default=[delivery_data['Region'].unique()[0]] if len(delivery_data['Region'].unique()) > 0 else []
     )
-    
-    # Date range slider using Unix timestamps
-    min_date = delivery_data['Date'].min()
-    max_date = delivery_data['Date'].max()
-    
+
+    # Date range slider bounds come from the partition index
+    partition_index = load_partition_index('delivery')
+    min_date = partition_index['Min Date'].min()
+    max_date = partition_index['Max Date'].max()
+
     # Convert to datetime.date for Streamlit compatibility
     min_date_date = min_date.date()
     max_date_date = max_date.date()
-    
+
     selected_dates = st.slider(
         "Select Date Range",
         min_value=min_date_date,
@@ -51,70 +96,259 @@ with tab1:
         value=(min_date_date, max_date_date),
         format="YYYY-MM-DD"
     )
-    
+
     # Convert back to Timestamp for filtering
     start_date = pd.Timestamp(selected_dates[0])
     end_date = pd.Timestamp(selected_dates[1])
-    
-    # Filter data
-    if regions:
-        filtered = delivery_data[
-            (delivery_data['Region'].isin(regions)) &
-            (delivery_data['Date'] >= start_date) &
-            (delivery_data['Date'] <= end_date)
-        ]
-        
-        if not filtered.empty:
-            col1, col2 = st.columns(2)
-            with col1:
-                fig1 = px.line(
-                    filtered.groupby('Date')['On-Time Rate'].mean().reset_index(),
-                    x='Date',
-                    y='On-Time Rate',
-                    title='On-Time Rate Trend'
-                )
-                st.plotly_chart(fig1, use_container_width=True)
-            
-            with col2:
-                fig2 = px.pie(
-                    filtered.groupby('Region')['Delayed Deliveries'].sum().reset_index(),
-                    names='Region',
-                    values='Delayed Deliveries',
-                    title='Delay Distribution by Region'
-                )
-                st.plotly_chart(fig2, use_container_width=True)
-        else:
-            st.warning("No data available for the selected filters")
-    else:
+
+    # Bucket size for the trend chart, chosen from the range width unless overridden
+    granularity_choice = st.radio(
+        "Trend Granularity",
+        options=["Auto"] + GRANULARITIES,
+        horizontal=True
+    )
+    granularity = pick_granularity(start_date, end_date) if granularity_choice == "Auto" else granularity_choice
+
+    if not regions:
         st.warning("Please select at least one region")
+        return
 
-with tab2:
+    # Rows in the date range, read only from the month partitions it overlaps
+    index = load_range_index('delivery', start_date, end_date, ['Region'])
+
+    # A slice clicked in the pie or a point clicked in the trend narrows every
+    # other chart to that region or month
+    focus = st.session_state.get('region_focus')
+    if focus not in regions:
+        focus = None
+    month_focus = st.session_state.get('month_focus')
+    if month_focus not in index.values('Month'):
+        month_focus = None
+    if focus is not None or month_focus is not None:
+        selected = ', '.join(str(value) for value in (focus, month_focus) if value is not None)
+        st.button(f"Clear selection ({selected})", on_click=_clear_focus)
+
+    # Filters and focus combined as bitwise ANDs over the bitmap index
+    month_filter = {'Month': [month_focus]} if month_focus is not None else {}
+    focus_regions = [focus] if focus is not None else regions
+    mask = index.select({'Region': focus_regions, **month_filter})
+
+    if index.count(mask) == 0:
+        st.warning("No data available for the selected filters")
+        return
+
+    # Charts read from day grids are narrowed to the focused month
+    if month_focus is not None:
+        month = pd.Period(month_focus)
+        view_start = max(start_date, month.start_time)
+        view_end = min(end_date, month.end_time.normalize())
+    else:
+        view_start, view_end = start_date, end_date
+    suffix = f" - {selected}" if focus is not None or month_focus is not None else ''
+
+    col1, col2 = st.columns(2)
+    with col1:
+        # The trend is where months are picked, so only the region focus applies to it
+        trend = on_time_trend(load_rate_series(delivery_data), focus_regions, start_date, end_date, granularity)
+        fig1 = px.line(
+            trend,
+            x='Date',
+            y='On-Time Rate',
+            markers=True,
+            title=f'On-Time Rate Trend (by {granularity.lower()})' + (f' - {focus}' if focus is not None else '')
+        )
+        plot_chart(fig1, key='trend_chart', on_select=_focus_month, selection_mode='points')
+
+    with col2:
+        # The pie is where regions are picked, so only the month focus applies to it
+        delays = index.sum_by(index.select({'Region': regions, **month_filter}), 'Region', 'Delayed Deliveries')
+        delays = delays[delays.index.isin(regions)].reset_index()
+        fig2 = px.pie(
+            delays,
+            names='Region',
+            values='Delayed Deliveries',
+            custom_data=['Region'],
+            title='Delay Distribution by Region' + (f' - {month_focus}' if month_focus is not None else '')
+        )
+        fig2.update_traces(pull=[0.1 if region == focus else 0 for region in delays['Region']])
+        plot_chart(fig2, key='region_pie', on_select=_focus_region, selection_mode='points')
+
+    # Trailing-window metrics from prefix sums over the day grids
+    window = pick_window('interactive_window')
+    grid = load_day_grid('delivery', delivery_data, 'Region', ['On-Time Deliveries', 'Delayed Deliveries'])
+    col1, col2 = st.columns(2)
+    with col1:
+        rolling = rolling_on_time(grid, focus_regions, view_start, view_end, window)
+        fig_rolling = px.line(
+            rolling,
+            x='Date',
+            y='Rolling On-Time Rate',
+            color='Region',
+            title=f'{window}-Day Rolling On-Time Rate{suffix}'
+        )
+        plot_chart(fig_rolling)
+    with col2:
+        shift_grid = load_day_grid('shift', shift_data, 'Shift Type', ['Average Deliveries per Shift'])
+        shift_rolling = rolling_mean(shift_grid, 'Average Deliveries per Shift', shift_grid.keys, view_start, view_end, window)
+        fig_shift = px.line(
+            shift_rolling,
+            x='Date',
+            y='Rolling Average Deliveries per Shift',
+            color='Shift Type',
+            title=f'{window}-Day Rolling Deliveries per Shift' + (f' - {month_focus}' if month_focus is not None else '')
+        )
+        plot_chart(fig_shift)
+
+    # Region x day heatmap, sliced from the precomputed grid
+    heatmap_metric = st.radio("Heatmap", ["On-Time Rate", "Delayed Deliveries"], horizontal=True)
+    grid_regions, grid_dates, grid_values = grid.window(focus_regions, view_start, view_end)
+    if heatmap_metric == "On-Time Rate":
+        total = grid_values['On-Time Deliveries'] + grid_values['Delayed Deliveries']
+        # Days without deliveries stay blank rather than reading as 0%
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cells = np.where(total > 0, grid_values['On-Time Deliveries'] / total * 100, np.nan)
+        color_scale = 'RdYlGn'
+    else:
+        cells = grid_values['Delayed Deliveries']
+        color_scale = 'Reds'
+    fig3 = px.imshow(
+        cells,
+        x=grid_dates,
+        y=list(grid_regions),
+        aspect='auto',
+        color_continuous_scale=color_scale,
+        labels={'x': 'Date', 'y': 'Region', 'color': heatmap_metric},
+        title=f'{heatmap_metric} by Region and Day{suffix}'
+    )
+    plot_chart(fig3)
+
+    # Rows behind the filters and focus, streamed to disk in chunks off the script thread
+    with st.expander("Export filtered rows"):
+        export_format = st.radio("Format", EXPORT_FORMATS, horizontal=True)
+        if st.button(f"Prepare {export_format} export ({index.count(mask):,} rows)"):
+            st.session_state.export_job = start_export(index, mask, export_format, 'delivery')
+        job = st.session_state.get('export_job')
+        if job is not None and not job.done:
+            # Polls while the file is written; the rerun after it finishes stops the polling
+            st.fragment(timed_fragment(export_progress), run_every=EXPORT_POLL_SECONDS)()
+        elif job is not None:
+            export_links(job)
+
+def export_progress():
+    job = st.session_state.export_job
+    if job.done:
+        st.rerun()
+    st.progress(job.rows_written / max(job.rows, 1), text=f"Writing {job.rows_written:,} of {job.rows:,} rows")
+
+def export_links(job):
+    remove_stale_exports()
+    if job.error:
+        st.error(f"Export failed: {job.error}")
+        return
+    for path in job.paths:
+        st.markdown(f"[Download {os.path.basename(path)}]({export_url(path)})")
+
+@st.fragment
+@timed_fragment
+def warehouse_processing_times(warehouse_data):
     # Warehouse selection
     warehouse = st.selectbox(
         "Select Warehouse",
-        options=sorted(warehouse_data['Warehouse ID'].unique())
+        options=sorted(warehouse_data['Warehouse ID'].unique()),
+        key='warehouse_select'
     )
-    
-    # Filter data
-    wh_data = warehouse_data[warehouse_data['Warehouse ID'] == warehouse]
-    
-    # Visualizations
-    if not wh_data.empty:
-        fig3 = px.histogram(
-            wh_data,
-            x=['Average Load Time (mins)', 'Average Unload Time (mins)'],
-            barmode='overlay',
-            title=f'Processing Times - Warehouse {warehouse}'
-        )
-        st.plotly_chart(fig3, use_container_width=True)
-        
-        fig4 = px.scatter(
-            warehouse_data,
-            x='Average Load Time (mins)',
-            y='Average Unload Time (mins)',
-            color='Warehouse ID',
-            title='All Warehouses Comparison'
-        )
-        st.plotly_chart(fig4, use_container_width=True)
-    else:
+
+    # Precomputed bin counts, so picking a warehouse is a lookup
+    wh_hists = load_warehouse_histograms(warehouse_data, WAREHOUSE_HIST_BINS).get(warehouse)
+
+    if wh_hists is None:
         st.warning("No data available for selected warehouse")
+        return
+
+    fig3 = histogram_figure(
+        wh_hists,
+        title=f'Processing Times - Warehouse {warehouse}',
+        x_label='Time (mins)'
+    )
+    plot_chart(fig3)
+
+def warehouse_comparison(warehouse_data):
+    # Does not depend on the selectbox, so it stays outside the fragment;
+    # clicking a point selects that warehouse for the histogram above
+    fig4 = px.scatter(
+        warehouse_data,
+        x='Average Load Time (mins)',
+        y='Average Unload Time (mins)',
+        color='Warehouse ID',
+        custom_data=['Warehouse ID'],
+        title='All Warehouses Comparison'
+    )
+    plot_chart(fig4, key='warehouse_scatter', on_select=_focus_warehouse, selection_mode='points')
+
+def _change_page(step):
+    st.session_state.raw_page = max(1, st.session_state.get('raw_page', 1) + step)
+
+def _first_page():
+    st.session_state.raw_page = 1
+
+@st.fragment
+@timed_fragment
+def raw_data(datasets):
+    # Only the visible page is sent to the browser; sorting runs on the server
+    # against cached sort orders and filtering against the bitmap index
+    col1, col2 = st.columns([1, 3])
+    dataset = col1.selectbox("Dataset", options=list(datasets), on_change=_first_page)
+    source, key_col, keys_available = datasets[dataset]
+    keys = col2.multiselect(f"Filter {key_col}", options=keys_available, on_change=_first_page)
+
+    # Only the month partitions overlapping the range are read
+    partition_index = load_partition_index(source)
+    min_date, max_date = partition_index['Min Date'].min().date(), partition_index['Max Date'].max().date()
+    start_date, end_date = st.slider(
+        "Date Range",
+        min_value=min_date,
+        max_value=max_date,
+        value=(min_date, max_date),
+        format="YYYY-MM-DD",
+        key=f'raw_dates_{source}',
+        on_change=_first_page
+    )
+    table = load_range_table(source, pd.Timestamp(start_date), pd.Timestamp(end_date), key_col)
+
+    col1, col2, col3 = st.columns(3)
+    sort_col = col1.selectbox("Sort by", options=list(table.df.columns), on_change=_first_page)
+    descending = col2.checkbox("Descending", on_change=_first_page)
+    page_size = col3.selectbox("Rows per page", options=PAGE_SIZES, index=1, on_change=_first_page)
+
+    positions = table.view(sort_col, descending, {key_col: keys} if keys else None)
+    pages = max(1, -(-len(positions) // page_size))
+    page = min(st.session_state.get('raw_page', 1), pages)
+    st.session_state.raw_page = page
+
+    rows = table.page(positions, page, page_size)
+    st.dataframe(rows, hide_index=True)
+
+    col1, col2, col3 = st.columns([1, 4, 1])
+    col1.button("◀ Previous", on_click=_change_page, args=(-1,), disabled=page <= 1)
+    first = (page - 1) * page_size
+    col2.caption(f"Rows {first + 1 if len(positions) else 0:,}–{first + len(rows):,} of {len(positions):,} (page {page} of {pages})")
+    col3.button("Next ▶", on_click=_change_page, args=(1,), disabled=page >= pages)
+
+# Tabs
+tab1, tab2, tab3 = st.tabs(["Delivery Analysis", "Warehouse Analysis", "Raw Data"])
+
+with tab1:
+    delivery_analysis(delivery_data, shift_data)
+
+with tab2:
+    warehouse_processing_times(warehouse_data)
+    warehouse_comparison(warehouse_data)
+
+with tab3:
+    raw_data({
+        'Delivery': ('delivery', 'Region', sorted(delivery_data['Region'].dropna().unique())),
+        'Warehouse': ('warehouse', 'Warehouse ID', sorted(warehouse_data['Warehouse ID'].dropna().unique())),
+        'Shift': ('shift', 'Shift Type', sorted(shift_data['Shift Type'].dropna().unique()))
+    })
+
+finish_page()
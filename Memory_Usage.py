@@ -0,0 +1,61 @@
+import hmac
+import json
+import os
+import pandas as pd
+import streamlit as st
+from utils.data_loader import shared_caches
+from utils.memory import memory_report
+from utils.metrics import finish_page, start_page
+
+start_page('Memory_Usage')
+
+# Page config
+st.set_page_config(
+    page_title="Memory Accounting",
+    page_icon="🧠",
+    layout="wide"
+)
+
+st.title("🧠 Memory Accounting")
+
+# Admin only: the page is disabled unless a token is configured, and asks for it
+admin_token = os.environ.get("DASHBOARD_ADMIN_TOKEN")
+if not admin_token:
+    st.info("Set DASHBOARD_ADMIN_TOKEN on the server to enable this page.")
+    st.stop()
+
+if not hmac.compare_digest(st.text_input("Admin token", type="password").encode(), admin_token.encode()):
+    st.stop()
+
+report = memory_report(shared_caches())
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Process RSS", f"{report['process_rss_mb']:.1f} MB")
+col2.metric("Active Sessions", report['active_sessions'])
+col3.metric("Duplicated DataFrames", report['duplicated_frames'])
+col4.metric("Duplicate Copies", f"{report['duplicated_frame_copies_mb']:.1f} MB")
+
+st.subheader("Memory per Session")
+st.dataframe(pd.DataFrame(report['sessions'], columns=['Session', 'Objects', 'MB']), hide_index=True)
+
+st.subheader("Cached Objects")
+objects = pd.DataFrame(report['objects'], columns=['Session', 'Object', 'Type', 'MB'])
+st.dataframe(objects.sort_values('MB', ascending=False), hide_index=True)
+
+st.subheader("Caches")
+col1, col2 = st.columns(2)
+with col1:
+    st.caption("Per-session caches")
+    st.dataframe(pd.DataFrame(report['session_caches'], columns=['Cache', 'Hits', 'Misses', 'Hit Ratio']), hide_index=True)
+with col2:
+    st.caption("Shared caches")
+    st.dataframe(pd.DataFrame(report['shared_caches'], columns=['Cache', 'Entries', 'MB']), hide_index=True)
+
+st.download_button(
+    "Download report (JSON)",
+    data=json.dumps(report, indent=2),
+    file_name="memory_report.json",
+    mime="application/json"
+)
+
+finish_page()
@@ -1,7 +1,15 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+from utils.charts import plot_chart
 from utils.data_loader import load_data
+from utils.page_data import prepare_overview
+from utils.aggregates import PERIODS, efficiency_series, load_cost_efficiency, load_period_totals
+from utils.rankings import load_warehouse_ranking
+from utils.alerts import ALERT_WINDOW, ALERT_Z_THRESHOLD, RECENT_DAYS, load_alerts
+from utils.metrics import finish_page, start_page
+
+start_page('Overview')
 
 # Page config
 st.set_page_config(
@@ -62,6 +70,9 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 
+# Most warehouses shown in the efficiency ranking chart
+WAREHOUSE_RANK_LIMIT = 20
+
 # Load data
 cost_data, delivery_data, warehouse_data, shift_data = load_data()
 
@@ -71,57 +82,50 @@ if cost_data.empty or delivery_data.empty or warehouse_data.empty or shift_data.
     st.stop()
 
 # Data Processing
-# Convert month to datetime if needed
-if 'Month' in cost_data.columns:
-    try:
-        cost_data['Month'] = pd.to_datetime(cost_data['Month'])
-    except Exception as e:
-        st.error(f"Error converting dates: {str(e)}")
-        st.stop()
-
-# Calculate KPIs
-total_deliveries = delivery_data['On-Time Deliveries'].sum() + delivery_data['Delayed Deliveries'].sum()
-on_time_rate = (delivery_data['On-Time Deliveries'].sum() / total_deliveries) * 100 if total_deliveries > 0 else 0
-delay_rate = (delivery_data['Delayed Deliveries'].sum() / total_deliveries) * 100 if total_deliveries > 0 else 0
-
-# Cost metrics
-total_cost = cost_data['Fuel Cost'].sum() + cost_data['Maintenance Cost'].sum()
-cost_per_delivery = total_cost / total_deliveries if total_deliveries > 0 else 0
-budget_variance = 0.15  # Example value - would normally come from budget data
-
-# Warehouse metrics
-avg_load_time = warehouse_data['Average Load Time (mins)'].mean()
-avg_unload_time = warehouse_data['Average Unload Time (mins)'].mean()
-
-# Shift metrics
-day_shift_avg = shift_data[shift_data['Shift Type'] == 'Day Shift']['Average Deliveries per Shift'].mean()
-night_shift_avg = shift_data[shift_data['Shift Type'] == 'Night Shift']['Average Deliveries per Shift'].mean()
-productivity_gap = ((day_shift_avg - night_shift_avg) / day_shift_avg) * 100
+# Month as datetime and cost proportions, prepared the same way as the prefetch does
+try:
+    cost_data = prepare_overview(cost_data)
+except Exception as e:
+    st.error(f"Error converting dates: {str(e)}")
+    st.stop()
 
-# Metrics Section
+# KPIs for the latest period and the one before, from cumulative monthly totals
 st.subheader("Key Performance Indicators")
+comparison = st.radio("Compare", options=list(PERIODS), index=1, horizontal=True)
+period_totals = load_period_totals(cost_data, delivery_data, warehouse_data)
+current, previous = period_totals.compare(PERIODS[comparison])
+st.caption(f"Latest period: {period_totals.period_label(PERIODS[comparison])}")
+
+def delta_badge(kpi, higher_is_better, unit='', decimals=1):
+    """Arrow and change vs the previous period, green when it moved the right way"""
+    if previous is None or pd.isna(previous[kpi]) or pd.isna(current[kpi]):
+        return f'<span class="kpi-badge">n/a {comparison}</span>'
+    change = current[kpi] - previous[kpi]
+    trend_class = "positive" if (change >= 0) == higher_is_better else "negative"
+    return f'<span class="kpi-badge {trend_class}">{"↑" if change >= 0 else "↓"} {change:+.{decimals}f}{unit} {comparison}</span>'
+
+def kpi_value(values, kpi, fmt):
+    return "n/a" if values is None or pd.isna(values[kpi]) else fmt.format(values[kpi])
+
+# Metrics Section
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    trend = "↑" if on_time_rate > 82 else "↓"
-    trend_class = "positive" if on_time_rate > 82 else "negative"
     st.markdown(f"""
     <div class="metric-card">
         <h3>On-Time Delivery</h3>
-        <h1>{on_time_rate:.1f}% <span class="kpi-badge {trend_class}">{trend} vs last quarter</span></h1>
-        <p>Industry benchmark: 95%</p>
+        <h1>{kpi_value(current, 'On-Time Rate', '{:.1f}%')} {delta_badge('On-Time Rate', True, ' pp')}</h1>
+        <p>Previous period: {kpi_value(previous, 'On-Time Rate', '{:.1f}%')}</p>
         <p>Target: 90%</p>
     </div>
     """, unsafe_allow_html=True)
 
 with col2:
-    trend = "↑" if delay_rate < 18 else "↓"
-    trend_class = "positive" if delay_rate < 18 else "negative"
     st.markdown(f"""
     <div class="metric-card">
         <h3>Delay Rate</h3>
-        <h1>{delay_rate:.1f}% <span class="kpi-badge {trend_class}">{trend} vs last quarter</span></h1>
-        <p>Last quarter: 18.2%</p>
+        <h1>{kpi_value(current, 'Delay Rate', '{:.1f}%')} {delta_badge('Delay Rate', False, ' pp')}</h1>
+        <p>Previous period: {kpi_value(previous, 'Delay Rate', '{:.1f}%')}</p>
         <p>Target: 10%</p>
     </div>
     """, unsafe_allow_html=True)
@@ -130,9 +134,8 @@ with col3:
     st.markdown(f"""
     <div class="metric-card">
         <h3>Cost per Delivery</h3>
-        <h1>${cost_per_delivery:.2f}</h1>
-        <p>Budget: ${cost_per_delivery * 0.85:.2f}</p>
-        <p>Variance: +15%</p>
+        <h1>{kpi_value(current, 'Cost per Delivery', '${:.2f}')} {delta_badge('Cost per Delivery', False, decimals=2)}</h1>
+        <p>Previous period: {kpi_value(previous, 'Cost per Delivery', '${:.2f}')}</p>
     </div>
     """, unsafe_allow_html=True)
 
@@ -140,8 +143,8 @@ with col4:
     st.markdown(f"""
     <div class="metric-card">
         <h3>Warehouse Efficiency</h3>
-        <h1>Load: {avg_load_time:.1f} mins</h1>
-        <h1>Unload: {avg_unload_time:.1f} mins</h1>
+        <h1>Load: {kpi_value(current, 'Load Time', '{:.1f} mins')} {delta_badge('Load Time', False)}</h1>
+        <h1>Unload: {kpi_value(current, 'Unload Time', '{:.1f} mins')} {delta_badge('Unload Time', False)}</h1>
         <p>Target: 60 mins (combined)</p>
     </div>
     """, unsafe_allow_html=True)
@@ -149,11 +152,6 @@ with col4:
 # Cost Analysis Section
 st.subheader("Cost Breakdown Analysis")
 
-# Calculate cost proportions
-cost_data['Total Cost'] = cost_data['Fuel Cost'] + cost_data['Maintenance Cost']
-cost_data['Fuel %'] = (cost_data['Fuel Cost'] / cost_data['Total Cost']) * 100
-cost_data['Maintenance %'] = (cost_data['Maintenance Cost'] / cost_data['Total Cost']) * 100
-
 tab1, tab2, tab3 = st.tabs(["Trend", "Composition", "Efficiency"])
 
 with tab1:
@@ -164,7 +162,7 @@ with tab1:
         title='Monthly Operational Costs',
         labels={'value': 'Cost ($)', 'variable': 'Cost Type'}
     )
-    st.plotly_chart(fig1, use_container_width=True)
+    plot_chart(fig1)
 
 with tab2:
     fig2 = px.bar(
@@ -176,15 +174,12 @@ with tab2:
         title='Cost Composition Over Time',
         labels={'value': 'Percentage (%)', 'variable': 'Cost Type'}
     )
-    st.plotly_chart(fig2, use_container_width=True)
+    plot_chart(fig2)
 
 with tab3:
-    # Calculate deliveries per cost
-    monthly_deliveries = delivery_data.groupby(delivery_data['Date'].dt.to_period('M'))['On-Time Deliveries'].sum().reset_index()
-    monthly_deliveries['Month'] = pd.to_datetime(monthly_deliveries['Date'].astype(str))
-    cost_efficiency = pd.merge(cost_data, monthly_deliveries, on='Month')
-    cost_efficiency['Deliveries per $1k'] = (cost_efficiency['On-Time Deliveries'] / (cost_efficiency['Total Cost'] / 1000))
-    
+    # Deliveries per cost, read from the materialized monthly view
+    cost_efficiency = efficiency_series(load_cost_efficiency(cost_data, delivery_data))
+
     fig3 = px.line(
         cost_efficiency,
         x='Month',
@@ -192,7 +187,7 @@ with tab3:
         title='Operational Efficiency (Deliveries per $1k Spent)',
         markers=True
     )
-    st.plotly_chart(fig3, use_container_width=True)
+    plot_chart(fig3)
 
 # Performance Benchmarking Section
 st.subheader("Performance Benchmarking")
@@ -201,21 +196,21 @@ bench_col1, bench_col2 = st.columns(2)
 
 with bench_col1:
     # Warehouse performance comparison
-    warehouse_summary = warehouse_data.groupby('Warehouse ID').agg({
-        'Average Load Time (mins)': 'mean',
-        'Average Unload Time (mins)': 'mean'
-    }).reset_index()
+    # Slowest warehouses by partial selection, shown fastest first
+    ranking = load_warehouse_ranking(warehouse_data)
+    slowest = ranking.top(WAREHOUSE_RANK_LIMIT).index[::-1]
+    warehouse_summary = ranking.means().loc[slowest].rename_axis('Warehouse ID').reset_index()
     warehouse_summary['Total Processing Time'] = warehouse_summary['Average Load Time (mins)'] + warehouse_summary['Average Unload Time (mins)']
-    
+
     fig4 = px.bar(
-        warehouse_summary.sort_values('Total Processing Time'),
+        warehouse_summary,
         x='Warehouse ID',
         y='Total Processing Time',
         color='Total Processing Time',
-        title='Warehouse Efficiency Ranking',
+        title=f'Warehouse Efficiency Ranking (slowest {WAREHOUSE_RANK_LIMIT})',
         color_continuous_scale='RdYlGn_r'
     )
-    st.plotly_chart(fig4, use_container_width=True)
+    plot_chart(fig4)
 
 with bench_col2:
     # Shift productivity comparison
@@ -223,7 +218,7 @@ with bench_col2:
         'Average Deliveries per Shift': 'mean',
         'Idle Time (hours)': 'mean'
     }).reset_index()
-    
+
     fig5 = px.bar(
         shift_productivity,
         x='Shift Type',
@@ -232,32 +227,28 @@ with bench_col2:
         title='Shift Productivity vs Idle Time',
         color_continuous_scale='Viridis'
     )
-    st.plotly_chart(fig5, use_container_width=True)
+    plot_chart(fig5)
 
 # Alert Section
 st.subheader("Priority Alerts")
 
-if delay_rate > 15:
-    st.error("""
-    🚨 **High Delay Rate Alert**  
-    Current delay rate is above 15%. Immediate action recommended in:
-    - East region warehouses
-    - Night shift scheduling
-    """)
-
-if cost_per_delivery > 50:
-    st.warning("""
-    ⚠️ **Cost Efficiency Warning**  
-    Cost per delivery exceeds $50. Focus areas:
-    - Fuel consumption optimization
-    - Preventive maintenance program
-    """)
-
-if productivity_gap > 20:
-    st.info("""
-    ℹ️ **Productivity Gap Notice**  
-    Night shift productivity is significantly lower than day shift. Consider:
-    - Shift realignment
-    - Additional training
-    - Incentive programs
-    """)
+# Published by the streaming detector; the page only reads them
+alerts = load_alerts(delivery_data, warehouse_data, shift_data)
+st.caption(f"Deviations of {ALERT_Z_THRESHOLD}σ or more from each entity's last {ALERT_WINDOW} records, over the last {RECENT_DAYS} days of data")
+
+if alerts.empty:
+    st.success("✅ No anomalies detected in recent data")
+
+for alert in alerts.rename(columns={'Z-Score': 'Z'}).itertuples(index=False):
+    direction = "above" if alert.Z > 0 else "below"
+    message = (
+        f"**{alert.Kind} {alert.Entity}: {alert.Metric} {direction} normal**  \n"
+        f"{alert.Value:.1f} on {alert.Date:%Y-%m-%d} vs a trailing average of {alert.Baseline:.1f} (z = {alert.Z:+.1f})"
+    )
+    # Higher delay, processing and idle time are all bad news
+    if alert.Z > 0:
+        st.error("🚨 " + message)
+    else:
+        st.info("ℹ️ " + message)
+
+finish_page()
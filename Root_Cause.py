@@ -2,7 +2,15 @@ import streamlit as st
 import plotly.express as px
 import pandas as pd
 import numpy as np
+from utils.charts import plot_chart
 from utils.data_loader import load_data
+from utils.histograms import histogram_figure, load_histogram
+from utils.page_data import prepare_root_cause
+from utils.rankings import load_region_ranking, load_shift_ranking, load_warehouse_ranking
+from utils.simulation import SIM_DOCKS, SIM_TRIALS, load_empirical_times, p95_wait, simulate_pooled, summarize
+from utils.metrics import finish_page, start_page, timed_fragment
+
+start_page('Root_Cause')
 
 # Page config
 st.set_page_config(
@@ -11,6 +19,11 @@ st.set_page_config(
     layout="wide"
 )
 
+# Regions highlighted in the delay-rate chart
+TOP_DELAY_REGIONS = 3
+# Shifts listed in the worst-shifts table
+SHIFT_RANK_LIMIT = 10
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -71,6 +84,8 @@ st.markdown("""
 
 # Load data
 _, delivery_data, warehouse_data, shift_data = load_data()
+# Combined processing time and shift utilization, prepared the same way as the prefetch does
+warehouse_data, shift_data = prepare_root_cause(warehouse_data, shift_data)
 
 # Page header
 st.title("🔍 Root Cause Analysis")
@@ -128,16 +143,13 @@ st.markdown("""
 col1, col2 = st.columns(2)
 with col1:
     # Warehouse processing time distribution with targets
-    warehouse_data['Combined Time'] = warehouse_data['Average Load Time (mins)'] + warehouse_data['Average Unload Time (mins)']
-    fig1 = px.histogram(
-        warehouse_data,
-        x='Combined Time',
-        nbins=20,
+    fig1 = histogram_figure(
+        {'Combined Time': load_histogram('combined_time', warehouse_data, 'Combined Time', 20)},
         title='Warehouse Processing Time Distribution',
-        labels={'Combined Time': 'Total Processing Time (mins)'},
-        color_discrete_sequence=['#e63946']
+        x_label='Total Processing Time (mins)',
+        colors=['#e63946']
     )
-    
+
     # Add target line
     target_time = 120  # Example target
     fig1.add_vline(
@@ -147,18 +159,15 @@ with col1:
         annotation_text=f"Target: {target_time} mins", 
         annotation_position="top"
     )
-    
-    st.plotly_chart(fig1, use_container_width=True)
+
+    plot_chart(fig1)
 
 with col2:
     # Worst performing warehouses with cost impact
-    warehouse_summary = warehouse_data.groupby('Warehouse ID').agg({
-        'Average Load Time (mins)': 'mean',
-        'Average Unload Time (mins)': 'mean'
-    }).mean(axis=1).sort_values(ascending=False).head(5).reset_index()
+    warehouse_summary = load_warehouse_ranking(warehouse_data).top(5).reset_index()
     warehouse_summary.columns = ['Warehouse ID', 'Average Processing Time']
     warehouse_summary['Cost Impact ($K/yr)'] = [320, 280, 210, 180, 150]  # Example data
-    
+
     fig2 = px.bar(
         warehouse_summary,
         x='Warehouse ID',
@@ -168,7 +177,7 @@ with col2:
         labels={'value': 'Metric', 'variable': 'Measure'},
         color_discrete_sequence=['#e63946', '#457b9d']
     )
-    st.plotly_chart(fig2, use_container_width=True)
+    plot_chart(fig2)
 
 st.markdown("""
 <div class="key-insight">
@@ -177,6 +186,68 @@ st.markdown("""
     that delays subsequent delivery operations.
 </div>
 """, unsafe_allow_html=True)
+@st.fragment
+@timed_fragment
+def dock_what_if(warehouse_data, slowest):
+    """Monte Carlo dock queues, baseline vs. faster processing at chosen warehouses"""
+    times = load_empirical_times(warehouse_data)
+    with st.form('dock_what_if'):
+        col1, col2, col3 = st.columns(3)
+        targets = col1.multiselect("Warehouses", options=list(times.warehouses), default=slowest)
+        load_cut = col2.slider("Load time reduction (%)", 0, 80, 40, 5)
+        unload_cut = col3.slider("Unload time reduction (%)", 0, 80, 0, 5)
+        trucks = col1.slider("Trucks per day", 2, 40, 14)
+        docks = col2.number_input("Docks per warehouse", 1, 10, SIM_DOCKS)
+        trials = col3.select_slider("Trials", options=[500, 1000, 2000, 5000], value=SIM_TRIALS)
+        st.form_submit_button("Simulate")
+
+    changed = np.isin(times.warehouses, targets)
+    load_factor = np.where(changed, 1 - load_cut / 100, 1.0)
+    unload_factor = np.where(changed, 1 - unload_cut / 100, 1.0)
+    # Same seed for both runs: differences come from the change, not sampling noise
+    baseline_result = simulate_pooled(times, trucks, docks=docks, trials=trials)
+    scenario_result = simulate_pooled(times, trucks, load_factor, unload_factor, docks=docks, trials=trials)
+    baseline, scenario = summarize(times, baseline_result), summarize(times, scenario_result)
+
+    col1, col2, col3 = st.columns(3)
+    selected = baseline.index.isin(targets)
+    if selected.any():
+        col1.metric(
+            "Mean Wait at Selected",
+            f"{scenario.loc[selected, 'Mean Wait (mins)'].mean():.1f} mins",
+            f"{scenario.loc[selected, 'Mean Wait (mins)'].mean() - baseline.loc[selected, 'Mean Wait (mins)'].mean():.1f} mins",
+            delta_color="inverse"
+        )
+    col2.metric(
+        "Network Trucks per Day",
+        f"{scenario['Trucks per Day'].sum():.1f}",
+        f"{scenario['Trucks per Day'].sum() - baseline['Trucks per Day'].sum():+.1f}"
+    )
+    # Over every simulated truck in the network, not a percentile of per-trial averages
+    col3.metric(
+        "Network P95 Truck Wait",
+        f"{p95_wait(scenario_result):.0f} mins",
+        f"{p95_wait(scenario_result) - p95_wait(baseline_result):.0f} mins",
+        delta_color="inverse"
+    )
+
+    comparison = pd.concat({'Baseline': baseline, 'What-if': scenario}, names=['Scenario']).reset_index()
+    fig = px.bar(
+        comparison,
+        x='Warehouse ID',
+        y='Mean Wait (mins)',
+        color='Scenario',
+        barmode='group',
+        error_y=comparison['P95 Wait (mins)'] - comparison['Mean Wait (mins)'],
+        title=f'Simulated Dock Waiting Time ({trials:,} trials, bars to P95 truck wait)',
+        color_discrete_sequence=['#457b9d', '#2a9d8f']
+    )
+    fig.update_xaxes(type='category')
+    plot_chart(fig)
+
+with st.expander("What-if: dock queue simulation"):
+    dock_what_if(warehouse_data, list(warehouse_summary['Warehouse ID'][:2]))
+
 st.markdown("</div>", unsafe_allow_html=True)
 
 # Cause 2: Inefficient Shift Scheduling
@@ -198,7 +269,7 @@ with col1:
         'Idle Time (hours)': 'mean',
         'Utilization': 'mean'
     }).reset_index()
-    
+
     fig3 = px.bar(
         shift_summary,
         x='Shift Type',
@@ -208,7 +279,7 @@ with col1:
         labels={'value': 'Percentage (%) / Deliveries', 'variable': 'Metric'},
         color_discrete_sequence=['#2a9d8f', '#e9c46a']
     )
-    st.plotly_chart(fig3, use_container_width=True)
+    plot_chart(fig3)
 
 with col2:
     # Idle time impact with regression
@@ -225,15 +296,22 @@ with col2:
             'Idle Time (hours)': 'Idle Time (hours)'
         }
     )
-    
+
     # Add regression results
     results = px.get_trendline_results(fig4)
     r_squared = results.iloc[0]["px_fit_results"].rsquared
     fig4.update_layout(
         title=f'Idle Time Impact on Productivity (R²={r_squared:.2f})'
     )
-    
-    st.plotly_chart(fig4, use_container_width=True)
+
+    plot_chart(fig4)
+
+# Individual shifts with the most idle time, by partial selection
+shift_ranking = load_shift_ranking(shift_data)
+worst_shifts = shift_ranking.means().loc[shift_ranking.top(SHIFT_RANK_LIMIT).index].reset_index()
+worst_shifts['Date'] = worst_shifts['Date'].dt.date
+st.write(f"**Worst {SHIFT_RANK_LIMIT} Shifts by Idle Time**")
+st.dataframe(worst_shifts, hide_index=True)
 
 st.markdown("""
 <div class="key-insight">
@@ -280,22 +358,27 @@ with col1:
         textinfo='percent+label',
         hovertemplate="<b>%{label}</b><br>Delays: %{value}<br>Percentage: %{percent}"
     )
-    st.plotly_chart(fig5, use_container_width=True)
+    plot_chart(fig5)
 
 with col2:
     # Delay rate by region
+    # Every region is shown; the worst few by partial selection are highlighted
+    worst_regions = load_region_ranking(delivery_data).top(TOP_DELAY_REGIONS).index
+    regional_delays['Rank'] = np.where(
+        regional_delays['Region'].isin(worst_regions), f'Worst {TOP_DELAY_REGIONS}', 'Other'
+    )
     fig6 = px.bar(
-        regional_delays.sort_values('Delay %', ascending=False),
+        regional_delays,
         x='Region',
         y='Delay %',
-        color='Region',
-        title='Delay Rate by Region',
+        color='Rank',
+        title=f'Delay Rate by Region (worst {TOP_DELAY_REGIONS} highlighted)',
         text='Delay %',
-        color_discrete_sequence=px.colors.sequential.RdBu
+        color_discrete_map={f'Worst {TOP_DELAY_REGIONS}': '#e63946', 'Other': '#a8dadc'}
     )
     fig6.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
     fig6.update_layout(yaxis_title='Delay Rate (%)')
-    st.plotly_chart(fig6, use_container_width=True)
+    plot_chart(fig6)
 
 st.markdown("""
 <div class="key-insight">
@@ -338,7 +421,7 @@ with col1:
         title='Monthly Operational Costs vs Budget',
         labels={'value': 'Cost ($)', 'variable': 'Cost Type'}
     )
-    
+
     # Add budget line (example)
     fig7.add_hline(
         y=150000, 
@@ -347,8 +430,8 @@ with col1:
         annotation_text="Budget Target", 
         annotation_position="bottom right"
     )
-    
-    st.plotly_chart(fig7, use_container_width=True)
+
+    plot_chart(fig7)
 
 with col2:
     # Cost composition with benchmarks
@@ -361,7 +444,7 @@ with col2:
         title='Cost Composition vs Industry Benchmarks',
         labels={'value': 'Percentage (%)', 'variable': 'Cost Type'}
     )
-    
+
     # Add benchmark lines
     fig8.add_hline(
         y=45, 
@@ -377,8 +460,8 @@ with col2:
         annotation_text="Industry Maint. Avg", 
         annotation_position="top right"
     )
-    
-    st.plotly_chart(fig8, use_container_width=True)
+
+    plot_chart(fig8)
 
 st.markdown("""
 <div class="key-insight">
@@ -388,3 +471,5 @@ st.markdown("""
 </div>
 """, unsafe_allow_html=True)
 st.markdown("</div>", unsafe_allow_html=True)
+
+finish_page()
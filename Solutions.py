@@ -1,4 +1,11 @@
 import streamlit as st
+import plotly.express as px
+from utils.charts import plot_chart
+from utils.data_loader import load_data
+from utils.staffing import FLEX_SHARE, load_schedule
+from utils.metrics import finish_page, start_page
+
+start_page('Solutions')
 
 # Enhanced CSS for timeline styling
 st.markdown("""
@@ -191,5 +198,43 @@ content = """
 </div>
 """
 
-st.markdown(content, unsafe_allow_html=True)
-
+timeline_col, schedule_col = st.columns([3, 2])
+
+with timeline_col:
+    st.markdown(content, unsafe_allow_html=True)
+
+# Demand-based scheduling, solved from the forecast rather than assumed
+with schedule_col:
+    st.subheader("📅 Demand-Based Shift Schedule")
+    _, delivery_data, _, shift_data = load_data()
+    if delivery_data.empty or shift_data.empty:
+        st.error("Failed to load required data")
+        st.stop()
+
+    flex = st.slider("Demand movable between shifts", 0.0, 0.5, FLEX_SHARE, 0.05, format="%.2f")
+    schedule = load_schedule(delivery_data, shift_data, flex)
+
+    idle = schedule['Idle Hours'].sum()
+    baseline_idle = schedule['Baseline Idle Hours'].sum()
+    col1, col2 = st.columns(2)
+    col1.metric("Forecast Idle Hours", f"{idle:,.0f}", f"{(idle / baseline_idle - 1) * 100:.1f}% vs observed idle rates", delta_color="inverse")
+    col2.metric("Avg Crew-Hours per Day", f"{(schedule['Day Crew-Hours'] + schedule['Night Crew-Hours']).sum() / schedule['Date'].nunique():.1f}")
+
+    weekly = schedule.groupby(schedule['Date'].dt.to_period('W').dt.start_time)[['Day Crew-Hours', 'Night Crew-Hours']].sum() / 7
+    fig = px.area(
+        weekly.reset_index(),
+        x='Date',
+        y=['Day Crew-Hours', 'Night Crew-Hours'],
+        title='Recommended Crew-Hours per Day (weekly average)',
+        labels={'value': 'Crew-Hours', 'variable': 'Shift'}
+    )
+    plot_chart(fig)
+
+    region = st.selectbox("Region", sorted(schedule['Region'].unique()))
+    st.dataframe(
+        schedule[schedule['Region'] == region].drop(columns='Region').round({'Demand': 1, 'Idle Hours': 1, 'Baseline Idle Hours': 1}),
+        hide_index=True,
+        height=300
+    )
+
+finish_page()
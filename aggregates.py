@@ -0,0 +1,307 @@
+import numpy as np
+import pandas as pd
+from utils.data_loader import advance_shared, session_cache
+
+GRANULARITIES = ['Day', 'Week', 'Month']
+
+# Widest range (in days) plotted at each granularity before moving up a level
+AUTO_GRANULARITY_DAYS = [
+    (92, 'Day'),
+    (730, 'Week')
+]
+
+def pick_granularity(start, end):
+    """Choose day, week or month buckets from the width of a date range"""
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    for max_days, granularity in AUTO_GRANULARITY_DAYS:
+        if days <= max_days:
+            return granularity
+    return 'Month'
+
+def _bucket_start(dates, granularity):
+    """Map dates to the first day of their bucket"""
+    if granularity == 'Day':
+        return dates.dt.normalize()
+    if granularity == 'Week':
+        # Weeks run Monday to Sunday
+        return dates.dt.to_period('W-SUN').dt.start_time
+    return dates.dt.to_period('M').dt.start_time
+
+def build_rate_series(delivery_data):
+    """Precompute delivery totals per Region at every granularity"""
+    series = {}
+    for granularity in GRANULARITIES:
+        buckets = _bucket_start(delivery_data['Date'], granularity)
+        series[granularity] = (
+            delivery_data
+            .groupby(['Region', buckets.rename('Date')])[['On-Time Deliveries', 'Delayed Deliveries']]
+            .sum()
+            .reset_index()
+        )
+    return series
+
+def load_rate_series(delivery_data):
+    """Return the precomputed per-Region series, built once per data version"""
+    return session_cache('rate_series', build_rate_series, delivery_data)
+
+def _bucket_end(date, granularity):
+    """Last day of the bucket a single date falls in"""
+    if granularity == 'Day':
+        return date.normalize()
+    return date.to_period('W-SUN' if granularity == 'Week' else 'M').end_time.normalize()
+
+def on_time_trend(series, regions, start, end, granularity):
+    """On-Time Rate per bucket for the selected regions, read from the precomputed series
+
+    Buckets lying wholly inside start..end come from the series at that
+    granularity. The first and last buckets may straddle the range, so they
+    are summed from the daily series over their days inside it instead.
+    """
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    day = pd.Timedelta(days=1)
+    first_bucket = _bucket_start(pd.Series([start]), granularity).iloc[0]
+    # Days before full_start or after full_end belong to partially covered buckets
+    full_start = start if first_bucket == start else _bucket_end(start, granularity) + day
+    full_end = end if _bucket_end(end, granularity) == end else _bucket_start(pd.Series([end]), granularity).iloc[0] - day
+
+    table = series[granularity]
+    full = table[
+        (table['Region'].isin(regions)) &
+        (table['Date'] >= full_start) &
+        (table['Date'] <= full_end)
+    ]
+    days = series['Day']
+    edges = days[
+        (days['Region'].isin(regions)) &
+        (days['Date'] >= start) &
+        (days['Date'] <= end) &
+        ((days['Date'] < full_start) | (days['Date'] > full_end))
+    ]
+    edges = edges.assign(Date=_bucket_start(edges['Date'], granularity))
+
+    rows = pd.concat([full, edges], ignore_index=True)
+    trend = rows.groupby('Date')[['On-Time Deliveries', 'Delayed Deliveries']].sum().reset_index()
+    trend['On-Time Rate'] = (
+        trend['On-Time Deliveries'] /
+        (trend['On-Time Deliveries'] + trend['Delayed Deliveries'])
+    ) * 100
+    return trend
+
+# --- Dense (key, day) grids ---
+
+class DayGrid:
+    """Totals per key and calendar day as dense (keys, days) arrays
+
+    Keys map to rows through their category codes and dates to columns
+    through their offset from the first day, so a date range is a column slice.
+    """
+
+    def __init__(self, df, key_col, value_cols, date_col='Date'):
+        rows = df.dropna(subset=[key_col, date_col])
+        self.key_col = key_col
+        days = rows[date_col].dt.normalize()
+        self.start = days.min()
+        self.dates = pd.date_range(self.start, days.max(), freq='D')
+        codes, self.keys = pd.factorize(rows[key_col], sort=True)
+        offsets = (days - self.start).dt.days.to_numpy()
+        cells = codes * len(self.dates) + offsets
+        shape = (len(self.keys), len(self.dates))
+        self.values = {
+            col: np.bincount(cells, weights=rows[col].fillna(0).to_numpy(dtype=float), minlength=shape[0] * shape[1]).reshape(shape)
+            for col in value_cols
+        }
+        self.rows = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+        # Running totals with a leading zero column: any window sum is one subtraction
+        self.prefix = {
+            col: np.concatenate([np.zeros((shape[0], 1)), np.cumsum(values, axis=1)], axis=1)
+            for col, values in {**self.values, 'Rows': self.rows}.items()
+        }
+
+    def columns(self, start, end):
+        """Column slice covering start..end, inclusive"""
+        first = max((pd.Timestamp(start) - self.start).days, 0)
+        last = min((pd.Timestamp(end) - self.start).days + 1, len(self.dates))
+        return slice(first, max(first, last))
+
+    def key_rows(self, keys):
+        rows = self.keys.get_indexer(list(keys))
+        return rows[rows >= 0]
+
+    def window(self, keys, start, end):
+        """Keys, dates and per-column arrays for the given keys and date range; only that block is copied"""
+        rows, cols = self.key_rows(keys), self.columns(start, end)
+        return self.keys[rows], self.dates[cols], {col: values[rows, cols] for col, values in self.values.items()}
+
+    def rolling_sum(self, col, window, keys, start, end):
+        """Sum of col over the trailing `window` days ending on each day of start..end ('Rows' counts records)"""
+        rows, cols = self.key_rows(keys), self.columns(start, end)
+        ends = np.arange(cols.start, cols.stop) + 1
+        prefix = self.prefix[col][rows]
+        return prefix[:, ends] - prefix[:, np.maximum(ends - window, 0)]
+
+def _ratio(top, bottom):
+    """top / bottom, blank where bottom is zero"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(bottom > 0, top / bottom, np.nan)
+
+def _long_frame(grid, keys, start, end, name, values):
+    """Long-format (Date, key, name) frame from a (keys, days) block of the grid"""
+    keys = grid.keys[grid.key_rows(keys)]
+    dates = grid.dates[grid.columns(start, end)]
+    return pd.DataFrame({
+        'Date': np.tile(dates, len(keys)),
+        grid.key_col: np.repeat(keys, len(dates)),
+        name: values.ravel()
+    })
+
+def rolling_on_time(grid, regions, start, end, window):
+    """Trailing-window on-time rate (%) per region and day"""
+    on_time = grid.rolling_sum('On-Time Deliveries', window, regions, start, end)
+    total = on_time + grid.rolling_sum('Delayed Deliveries', window, regions, start, end)
+    return _long_frame(grid, regions, start, end, 'Rolling On-Time Rate', _ratio(on_time, total) * 100)
+
+def rolling_mean(grid, col, keys, start, end, window):
+    """Trailing-window mean of col per record, per key and day"""
+    totals = grid.rolling_sum(col, window, keys, start, end)
+    records = grid.rolling_sum('Rows', window, keys, start, end)
+    return _long_frame(grid, keys, start, end, f'Rolling {col}', _ratio(totals, records))
+
+def load_day_grid(name, df, key_col, value_cols):
+    """Return the (key, day) grid, built once per data version"""
+    return session_cache(f'day_grid_{name}', DayGrid, df, key_col, value_cols)
+
+# --- Monthly cost-efficiency view ---
+
+def _monthly_on_time(delivery_data):
+    """On-Time Deliveries summed per calendar month"""
+    months = pd.to_datetime(delivery_data['Date']).dt.to_period('M').dt.start_time
+    return delivery_data.groupby(months.rename('Month'))['On-Time Deliveries'].sum()
+
+def _monthly_cost(cost_data):
+    """Cost rows indexed by month; a later row for the same month replaces an earlier one"""
+    costs = cost_data[['Month', 'Fuel Cost', 'Maintenance Cost']].copy()
+    costs['Month'] = pd.to_datetime(costs['Month'])
+    return costs.drop_duplicates('Month', keep='last').set_index('Month')
+
+def _refresh_efficiency(view, months):
+    """Recompute the derived columns for the given months only"""
+    rows = view.loc[months]
+    view.loc[months, 'Total Cost'] = rows['Fuel Cost'] + rows['Maintenance Cost']
+    view.loc[months, 'Deliveries per $1k'] = (
+        view.loc[months, 'On-Time Deliveries'] / (view.loc[months, 'Total Cost'] / 1000)
+    )
+
+def build_cost_efficiency(cost_data, delivery_data):
+    """Materialize monthly costs, on-time deliveries and Deliveries per $1k"""
+    view = _monthly_cost(cost_data).join(_monthly_on_time(delivery_data), how='outer').sort_index()
+    view['Total Cost'] = float('nan')
+    view['Deliveries per $1k'] = float('nan')
+    _refresh_efficiency(view, view.index)
+    return view
+
+def update_cost_efficiency(view, new_cost=None, new_delivery=None):
+    """Fold new cost or delivery rows into the view, touching only their months"""
+    touched = pd.DatetimeIndex([])
+
+    if new_delivery is not None and not new_delivery.empty:
+        added = _monthly_on_time(new_delivery)
+        view = view.reindex(view.index.union(added.index))
+        view.loc[added.index, 'On-Time Deliveries'] = (
+            view.loc[added.index, 'On-Time Deliveries'].fillna(0) + added
+        )
+        touched = touched.union(added.index)
+
+    if new_cost is not None and not new_cost.empty:
+        costs = _monthly_cost(new_cost)
+        view = view.reindex(view.index.union(costs.index))
+        view.loc[costs.index, ['Fuel Cost', 'Maintenance Cost']] = costs
+        touched = touched.union(costs.index)
+
+    if len(touched):
+        _refresh_efficiency(view, touched)
+    return view
+
+def load_cost_efficiency(cost_data, delivery_data):
+    """Return the cost-efficiency view, folding in each data version's new rows"""
+    return session_cache(
+        'cost_efficiency', advance_shared, 'cost_efficiency', build_cost_efficiency, update_cost_efficiency,
+        cost_data, delivery_data
+    )
+
+def efficiency_series(view):
+    """Months with both cost and delivery data, ready to plot"""
+    return view.dropna(subset=['Total Cost', 'On-Time Deliveries']).reset_index()
+
+# --- Period-over-period KPIs ---
+
+# Comparison windows: months in each period
+PERIODS = {'MoM': 1, 'QoQ': 3, 'YoY': 12}
+
+class PeriodTotals:
+    """Cumulative monthly totals behind the Overview KPIs
+
+    Any run of months is the difference of two rows of the cumulative
+    table, so comparing periods costs the same whatever their length.
+    """
+
+    COLUMNS = ['On-Time', 'Delayed', 'Cost', 'Load Sum', 'Load Count', 'Unload Sum', 'Unload Count']
+    # Totals that are missing, not zero, for a period with any month lacking rows
+    COMPLETE = ['On-Time', 'Delayed', 'Cost']
+
+    def __init__(self, cost_data, delivery_data, warehouse_data):
+        delivery_months = delivery_data['Date'].dt.to_period('M')
+        warehouse_months = warehouse_data['Date'].dt.to_period('M')
+        cost_months = pd.to_datetime(cost_data['Month']).dt.to_period('M')
+        monthly = pd.concat([
+            delivery_data.groupby(delivery_months)[['On-Time Deliveries', 'Delayed Deliveries']].sum()
+            .set_axis(['On-Time', 'Delayed'], axis=1),
+            (cost_data['Fuel Cost'] + cost_data['Maintenance Cost']).groupby(cost_months).sum(min_count=1).rename('Cost'),
+            warehouse_data.groupby(warehouse_months).agg(**{
+                'Load Sum': ('Average Load Time (mins)', 'sum'),
+                'Load Count': ('Average Load Time (mins)', 'count'),
+                'Unload Sum': ('Average Unload Time (mins)', 'sum'),
+                'Unload Count': ('Average Unload Time (mins)', 'count')
+            })
+        ], axis=1)
+        self.months = pd.period_range(monthly.index.min(), monthly.index.max(), freq='M')
+        monthly = monthly.reindex(self.months, columns=self.COLUMNS)
+        self.cumulative = np.vstack([np.zeros(len(self.COLUMNS)), np.cumsum(monthly.fillna(0).to_numpy(dtype=float), axis=0)])
+        # Months with data so far, per column
+        self.coverage = np.vstack([np.zeros(len(self.COLUMNS)), np.cumsum(monthly.notna().to_numpy(), axis=0)])
+        # Periods end at the latest month with deliveries
+        self.latest = self.months.get_loc(delivery_months.max()) + 1
+
+    def totals(self, first, stop):
+        """Column totals over months [first, stop) as positions into self.months"""
+        totals = self.cumulative[stop] - self.cumulative[first]
+        complete = self.coverage[stop] - self.coverage[first] == stop - first
+        totals = np.where(complete | ~np.isin(self.COLUMNS, self.COMPLETE), totals, np.nan)
+        return dict(zip(self.COLUMNS, totals))
+
+    @staticmethod
+    def kpis(totals):
+        deliveries = totals['On-Time'] + totals['Delayed']
+        ratio = lambda top, bottom: float(_ratio(top, bottom))
+        return {
+            'On-Time Rate': ratio(totals['On-Time'], deliveries) * 100,
+            'Delay Rate': ratio(totals['Delayed'], deliveries) * 100,
+            'Cost per Delivery': ratio(totals['Cost'], deliveries),
+            'Load Time': ratio(totals['Load Sum'], totals['Load Count']),
+            'Unload Time': ratio(totals['Unload Sum'], totals['Unload Count'])
+        }
+
+    def compare(self, months):
+        """KPIs for the latest `months` months and the period before (None without enough history)"""
+        current = self.kpis(self.totals(max(self.latest - months, 0), self.latest))
+        if self.latest < 2 * months:
+            return current, None
+        return current, self.kpis(self.totals(self.latest - 2 * months, self.latest - months))
+
+    def period_label(self, months):
+        first = self.months[max(self.latest - months, 0)]
+        last = self.months[self.latest - 1]
+        return str(last) if first == last else f"{first}–{last}"
+
+def load_period_totals(cost_data, delivery_data, warehouse_data):
+    """Return the cumulative KPI totals, built once per data version"""
+    return session_cache('period_totals', PeriodTotals, cost_data, delivery_data, warehouse_data)
@@ -0,0 +1,137 @@
+from collections import deque
+import math
+import pandas as pd
+from utils.data_loader import advance_shared, session_cache
+
+# Trailing values per entity used for the baseline
+ALERT_WINDOW = 30
+# Minimum history before an entity can raise alerts
+ALERT_MIN_PERIODS = 10
+# |z| at or above this is reported
+ALERT_Z_THRESHOLD = 2.5
+# Alerts newer than this many days (relative to the latest row) are "recent"
+RECENT_DAYS = 14
+
+class RollingStats:
+    """Mean and standard deviation of the last `window` values with O(1) updates"""
+
+    def __init__(self, window):
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, value):
+        if len(self.values) == self.values.maxlen:
+            oldest = self.values[0]
+            self.total -= oldest
+            self.total_sq -= oldest * oldest
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+    @property
+    def count(self):
+        return len(self.values)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        if self.count < 2:
+            return 0.0
+        variance = (self.total_sq - self.count * self.mean ** 2) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+class AnomalyDetector:
+    """Flags values that deviate from each entity's trailing window
+
+    Every new row is scored against the window before being added to it, so
+    the cost per row is constant no matter how much history has been seen.
+    """
+
+    def __init__(self, window=ALERT_WINDOW, threshold=ALERT_Z_THRESHOLD,
+                 min_periods=ALERT_MIN_PERIODS, max_alerts=500):
+        self.window = window
+        self.threshold = threshold
+        self.min_periods = min_periods
+        self.stats = {}
+        self.alerts = deque(maxlen=max_alerts)
+        self.latest = None
+
+    def update(self, kind, entity, date, metric, value):
+        """Score one new value, record an alert if it deviates, then add it to the window"""
+        if pd.isna(value):
+            return None
+        stats = self.stats.setdefault((kind, entity), RollingStats(self.window))
+
+        alert = None
+        if stats.count >= self.min_periods and stats.std > 0:
+            z = (value - stats.mean) / stats.std
+            if abs(z) >= self.threshold:
+                alert = {
+                    'Date': date,
+                    'Kind': kind,
+                    'Entity': entity,
+                    'Metric': metric,
+                    'Value': value,
+                    'Baseline': stats.mean,
+                    'Z-Score': z
+                }
+                self.alerts.append(alert)
+
+        stats.push(value)
+        if self.latest is None or date > self.latest:
+            self.latest = date
+        return alert
+
+    def feed(self, rows, kind, metric, values):
+        """Stream rows (in date order) for one entity column through the detector"""
+        for entity, date, value in zip(rows[kind], rows['Date'], values):
+            self.update(kind, entity, date, metric, value)
+        return self
+
+    def recent(self, days=RECENT_DAYS):
+        """Alerts from the last `days` days of data, worst deviation first"""
+        columns = ['Date', 'Kind', 'Entity', 'Metric', 'Value', 'Baseline', 'Z-Score']
+        alerts = pd.DataFrame(list(self.alerts), columns=columns)
+        if alerts.empty:
+            return alerts
+        alerts = alerts[alerts['Date'] >= self.latest - pd.Timedelta(days=days)]
+        return alerts.reindex(alerts['Z-Score'].abs().sort_values(ascending=False).index)
+
+def _streams(delivery_data, warehouse_data, shift_data):
+    """(rows, entity column, metric, values) for every monitored series"""
+    return [
+        (delivery_data, 'Region', 'Delay Rate (%)', 100 - delivery_data['On-Time Rate']),
+        (
+            warehouse_data, 'Warehouse ID', 'Processing Time (mins)',
+            warehouse_data['Average Load Time (mins)'] + warehouse_data['Average Unload Time (mins)']
+        ),
+        (shift_data, 'Shift Type', 'Idle Time (hours)', shift_data['Idle Time (hours)'])
+    ]
+
+def _feed_streams(detector, delivery_data, warehouse_data, shift_data):
+    for rows, kind, metric, values in _streams(delivery_data, warehouse_data, shift_data):
+        order = rows['Date'].argsort(kind='stable')
+        detector.feed(rows.iloc[order], kind, metric, values.iloc[order])
+    return detector
+
+def build_detector(delivery_data, warehouse_data, shift_data):
+    """Replay the history through a fresh detector"""
+    return _feed_streams(AnomalyDetector(), delivery_data, warehouse_data, shift_data)
+
+def update_detector(detector, delivery_rows, warehouse_rows, shift_rows):
+    """Score rows dated after everything the detector has seen"""
+    return _feed_streams(detector, delivery_rows, warehouse_rows, shift_rows)
+
+def recent_alerts(delivery_data, warehouse_data, shift_data):
+    """Recent alerts from the shared detector, fed only each data version's new rows"""
+    return advance_shared(
+        'alert_detector', build_detector, update_detector, delivery_data, warehouse_data, shift_data
+    ).recent()
+
+def load_alerts(delivery_data, warehouse_data, shift_data):
+    """Recent alerts, advancing the shared detector once per data version"""
+    return session_cache('recent_alerts', recent_alerts, delivery_data, warehouse_data, shift_data)
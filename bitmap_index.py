@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from utils.data_loader import load_date_range, shared_cache
+
+class BitmapIndex:
+    """Packed bitsets per value of the indexed columns (plus calendar month)
+
+    Rows are kept in date order, so a date range is a contiguous run of bits.
+    A combined filter is a bitwise AND of packed uint8 arrays, one bit per row,
+    and aggregates are computed only over the rows whose bit is set.
+    """
+
+    def __init__(self, df, columns, date_col='Date'):
+        self.df = df.sort_values(date_col, kind='stable').reset_index(drop=True)
+        self.size = len(self.df)
+        self.dates = self.df[date_col].to_numpy()
+        self.codes = {}
+        self.bitmaps = {}
+
+        keys = {col: self.df[col] for col in columns}
+        keys['Month'] = self.df[date_col].dt.to_period('M').astype(str)
+        for col, values in keys.items():
+            codes, uniques = pd.factorize(values, sort=True)
+            self.codes[col] = (codes, uniques)
+            self.bitmaps[col] = self._build_bitmaps(codes, len(uniques))
+
+    def _build_bitmaps(self, codes, n_values):
+        """One packed bitset per distinct value, from a single sort of the codes"""
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(n_values + 1))
+        bitmaps = []
+        for i in range(n_values):
+            bits = np.zeros(self.size, dtype=bool)
+            bits[order[bounds[i]:bounds[i + 1]]] = True
+            bitmaps.append(np.packbits(bits))
+        return bitmaps
+
+    def values(self, col):
+        """Distinct values of an indexed column, sorted"""
+        return list(self.codes[col][1])
+
+    def all(self):
+        return np.packbits(np.ones(self.size, dtype=bool))
+
+    def values_mask(self, col, values):
+        """Rows whose col is any of values (OR of their bitsets)"""
+        _, uniques = self.codes[col]
+        mask = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        for i in uniques.get_indexer(list(values)):
+            if i >= 0:
+                mask |= self.bitmaps[col][i]
+        return mask
+
+    def date_mask(self, start, end):
+        """Rows dated between start and end, inclusive"""
+        lo = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start)), side='left')
+        hi = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end)), side='right')
+        bits = np.zeros(self.size, dtype=bool)
+        bits[lo:hi] = True
+        return np.packbits(bits)
+
+    def select(self, filters=None, start=None, end=None):
+        """AND together value filters ({column: values}) and an optional date range"""
+        mask = self.all()
+        for col, values in (filters or {}).items():
+            mask &= self.values_mask(col, values)
+        if start is not None and end is not None:
+            mask &= self.date_mask(start, end)
+        return mask
+
+    def bits(self, mask):
+        """The mask as one bool per row"""
+        return np.unpackbits(mask, count=self.size).astype(bool)
+
+    def positions(self, mask):
+        """Row positions of the set bits"""
+        return np.flatnonzero(np.unpackbits(mask, count=self.size))
+
+    def iter_positions(self, mask, chunk_rows):
+        """Row positions of the set bits, unpacked chunk_rows rows at a time"""
+        chunk_bytes = max(1, chunk_rows // 8)
+        for start in range(0, len(mask), chunk_bytes):
+            first_row = start * 8
+            bits = np.unpackbits(mask[start:start + chunk_bytes], count=min(chunk_bytes * 8, self.size - first_row))
+            rows = np.flatnonzero(bits)
+            if len(rows):
+                yield rows + first_row
+
+    def count(self, mask):
+        return int(np.unpackbits(mask, count=self.size).sum())
+
+    def sum_by(self, mask, group_col, value_col):
+        """Sum value_col per group over the selected rows"""
+        codes, uniques = self.codes[group_col]
+        rows = self.positions(mask)
+        # Rows with a missing group value have code -1
+        rows = rows[codes[rows] >= 0]
+        values = self.df[value_col].to_numpy(dtype=float)[rows]
+        totals = np.bincount(codes[rows], weights=values, minlength=len(uniques))
+        return pd.Series(totals, index=pd.Index(uniques, name=group_col), name=value_col)
+
+def _range_index(dataset, start, end, columns):
+    return BitmapIndex(load_date_range(dataset, start, end), columns)
+
+def load_range_index(dataset, start, end, columns):
+    """Bitmap index over a dataset's rows dated start..end, read from its month partitions
+
+    One index (and one date-sorted copy of the rows) serves every session.
+    """
+    return shared_cache(f'bitmap_index_{dataset}', _range_index, dataset, start, end, columns)
@@ -0,0 +1,110 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from utils.data_loader import session_cache
+
+BOOTSTRAP_REPLICATES = 2000
+CONFIDENCE = 0.95
+# Replicates resampled per block, bounding the (replicates, rows) index matrix
+BLOCK_CELLS = 5_000_000
+# Jobs with more replicate-rows than this are split across a process pool
+POOL_MIN_CELLS = 50_000_000
+
+def _group_layout(codes, n_groups):
+    """Row order grouping equal codes together, plus each group's offset and size"""
+    order = np.argsort(codes, kind='stable')
+    sizes = np.bincount(codes, minlength=n_groups)
+    return order, np.cumsum(sizes) - sizes, sizes
+
+def resample_means(values, codes, n_groups, replicates, seed=0):
+    """Bootstrap means of every group at once, as a (replicates, groups) array
+
+    Row j of the resampling matrix draws, for every observation slot, a
+    random observation from that slot's own group, so one matrix covers
+    all groups and a segmented sum turns it into per-group means.
+    """
+    rng = np.random.default_rng(seed)
+    order, offsets, sizes = _group_layout(codes, n_groups)
+    values = values[order]
+    slot_offsets = np.repeat(offsets, sizes)
+    slot_sizes = np.repeat(sizes, sizes)
+    # reduceat needs strictly valid starts; empty groups are masked afterwards
+    starts = np.minimum(offsets, max(len(values) - 1, 0))
+
+    means = np.empty((replicates, n_groups))
+    block = max(1, BLOCK_CELLS // max(len(values), 1))
+    for first in range(0, replicates, block):
+        rows = min(block, replicates - first)
+        picks = slot_offsets + (rng.random((rows, len(values))) * slot_sizes).astype(np.int64)
+        means[first:first + rows] = np.add.reduceat(values[picks], starts, axis=1) / np.maximum(sizes, 1)
+    means[:, sizes == 0] = np.nan
+    return means
+
+def _resample_chunk(args):
+    return resample_means(*args)
+
+def resample_means_pooled(values, codes, n_groups, replicates, seed=0, workers=None):
+    """resample_means, with large jobs split by replicate across processes"""
+    if replicates * len(values) < POOL_MIN_CELLS:
+        return resample_means(values, codes, n_groups, replicates, seed)
+    workers = workers or os.cpu_count() or 1
+    batches = [
+        (values, codes, n_groups, len(batch), seed * 1000 + i)
+        for i, batch in enumerate(np.array_split(np.arange(replicates), workers))
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(_resample_chunk, batches)))
+
+def _jackknife_acceleration(values, codes, n_groups):
+    """BCa acceleration per group, from the closed-form leave-one-out means"""
+    sizes = np.bincount(codes, minlength=n_groups)
+    totals = np.bincount(codes, weights=values, minlength=n_groups)
+    leave_one_out = (totals[codes] - values) / np.maximum(sizes[codes] - 1, 1)
+    deviation = np.bincount(codes, weights=leave_one_out, minlength=n_groups)[codes] / sizes[codes] - leave_one_out
+    cubed = np.bincount(codes, weights=deviation ** 3, minlength=n_groups)
+    squared = np.bincount(codes, weights=deviation ** 2, minlength=n_groups)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(squared > 0, cubed / (6 * squared ** 1.5), 0.0)
+
+def bootstrap_ci(df, group_cols, value_col, method='bca', replicates=BOOTSTRAP_REPLICATES,
+                 confidence=CONFIDENCE, seed=0):
+    """Mean and bootstrap confidence interval of value_col per group ('percentile' or 'bca')"""
+    rows = df.dropna(subset=group_cols + [value_col])
+    codes, groups = pd.MultiIndex.from_frame(rows[group_cols]).factorize(sort=True)
+    groups = pd.MultiIndex.from_tuples(groups, names=group_cols)
+    values = rows[value_col].to_numpy(dtype=float)
+    n_groups = len(groups)
+
+    sizes = np.bincount(codes, minlength=n_groups)
+    estimate = np.bincount(codes, weights=values, minlength=n_groups) / sizes
+    boot = np.sort(resample_means_pooled(values, codes, n_groups, replicates, seed), axis=0)
+
+    alpha = (1 - confidence) / 2
+    quantiles = np.tile([alpha, 1 - alpha], (n_groups, 1))
+    if method == 'bca':
+        # Bias correction from the share of replicates below the estimate
+        below = (boot < estimate).mean(axis=0) + 0.5 * (boot == estimate).mean(axis=0)
+        z0 = norm.ppf(np.clip(below, 1 / replicates, 1 - 1 / replicates))
+        accel = _jackknife_acceleration(values, codes, n_groups)[:, None]
+        z = z0[:, None] + norm.ppf(quantiles)
+        quantiles = norm.cdf(z0[:, None] + z / (1 - accel * z))
+
+    positions = np.clip(np.round(quantiles * (replicates - 1)).astype(int), 0, replicates - 1)
+    bounds = boot[positions, np.arange(n_groups)[:, None]]
+
+    result = groups.to_frame(index=False)
+    result['Mean'] = estimate
+    result['Lower'] = bounds[:, 0]
+    result['Upper'] = bounds[:, 1]
+    result['Count'] = sizes
+    # Error-bar lengths for plotly's error_y / error_y_minus
+    result['Error Plus'] = result['Upper'] - result['Mean']
+    result['Error Minus'] = result['Mean'] - result['Lower']
+    return result
+
+def load_bootstrap_ci(name, df, group_cols, value_col, method='bca'):
+    """Bootstrap intervals, computed once per data version"""
+    return session_cache(f'bootstrap_{name}_{method}', bootstrap_ci, df, group_cols, value_col, method)
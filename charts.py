@@ -0,0 +1,106 @@
+import logging
+import os
+import numpy as np
+import plotly.io as pio
+import streamlit as st
+from utils.metrics import FIGURE_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Largest serialized figure (bytes) sent per chart, overridable per deployment
+CHART_BYTE_BUDGET = int(os.environ.get("CHART_BYTE_BUDGET", 500_000))
+
+# Trace attributes that hold one value per point
+_POINT_ATTRS = ['x', 'y', 'z', 'values', 'customdata', 'text', 'hovertext']
+_MARKER_ATTRS = ['size', 'color']
+
+# Trace types where dropping points still gives a faithful picture
+_SAMPLED_TYPES = {'scatter', 'scattergl'}
+
+def _point_arrays(trace):
+    """Yield (owner, attribute) pairs for the per-point arrays of a trace"""
+    for attr in _POINT_ATTRS:
+        if attr in trace and _is_array(trace[attr]):
+            yield trace, attr
+    marker = getattr(trace, 'marker', None)
+    if marker is not None:
+        for attr in _MARKER_ATTRS:
+            if attr in marker and _is_array(marker[attr]):
+                yield marker, attr
+
+def _is_array(value):
+    return value is not None and not isinstance(value, str) and np.ndim(value) > 0
+
+def _compact_array(values):
+    """Downcast a numeric array to the narrowest typed-array dtype that keeps it readable"""
+    arr = np.asarray(values)
+    if arr.dtype.kind not in 'fiu' or arr.size == 0:
+        return values
+
+    if arr.dtype.kind == 'f':
+        finite = np.isfinite(arr)
+        if not finite.all() or not np.array_equal(arr, np.round(arr)):
+            # Charts never need more than single precision
+            return arr.astype(np.float32)
+        arr = arr.astype(np.int64)
+
+    dtype = np.result_type(np.min_scalar_type(arr.min()), np.min_scalar_type(arr.max()))
+    if dtype.itemsize > 4:
+        # Plotly typed arrays stop at 32-bit integers
+        return arr.astype(np.float64)
+    return arr.astype(dtype)
+
+def compact_figure(fig):
+    """Convert numeric trace data to compact typed arrays in place"""
+    for trace in fig.data:
+        for owner, attr in _point_arrays(trace):
+            owner[attr] = _compact_array(owner[attr])
+    return fig
+
+def payload_bytes(fig):
+    """Size of the JSON Streamlit sends to the browser for this figure"""
+    return len(pio.to_json(fig, validate=False).encode())
+
+def _thin_points(fig, ratio):
+    """Keep every n-th point of scatter traces; return True if anything was dropped"""
+    step = int(np.ceil(ratio))
+    thinned = False
+    for trace in fig.data:
+        if trace.type not in _SAMPLED_TYPES:
+            continue
+        for owner, attr in _point_arrays(trace):
+            values = owner[attr]
+            if len(values) > step:
+                owner[attr] = values[::step]
+                thinned = True
+    return thinned
+
+def plot_chart(fig, budget=None, **kwargs):
+    """Compact a figure, enforce the payload budget and render it
+
+    Extra keyword arguments (key, on_select, ...) go to st.plotly_chart,
+    whose return value is passed back.
+    """
+    budget = CHART_BYTE_BUDGET if budget is None else budget
+    compact_figure(fig)
+    size = payload_bytes(fig)
+
+    if size > budget:
+        title = fig.layout.title.text or "untitled chart"
+        logger.warning("Chart '%s' payload is %d bytes (budget %d)", title, size, budget)
+        if _thin_points(fig, size / budget):
+            size = payload_bytes(fig)
+            st.caption(f"Showing a sample of points to keep this chart under {budget // 1000} KB.")
+
+    FIGURE_BYTES.observe(size)
+    return st.plotly_chart(fig, use_container_width=True, **kwargs)
+
+# Preset rolling-window lengths, in days
+ROLLING_WINDOWS = [7, 30, 90]
+
+def pick_window(key):
+    """Rolling window length in days: a preset, or any length from a slider"""
+    choice = st.radio("Rolling Window", [f"{days} days" for days in ROLLING_WINDOWS] + ["Custom"], horizontal=True, key=key)
+    if choice == "Custom":
+        return st.slider("Window (days)", 2, 365, 14, key=f'{key}_days')
+    return int(choice.split()[0])
@@ -1,49 +1,403 @@
+import copy
+import datetime
+import functools
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
 import pandas as pd
 import streamlit as st
+from utils.memory import record_cache, track_session
+from utils.metrics import LOAD_SECONDS, record_rows
+from utils.validation import VALUE_COLS, validate
 
-def _raw_load_data():
-    """Load and validate data without caching"""
+COST_FILE = "cost_breakdown_data.csv"
+
+# Source files for the dated datasets, keyed by the name used in partitions
+DATASET_FILES = {
+    'delivery': "delivery_performance_data.csv",
+    'warehouse': "warehouse_turnaround_data.csv",
+    'shift': "shift_performance_data.csv"
+}
+
+PARTITION_ROOT = "partitions"
+PARTITION_INDEX = "_index.csv"
+
+# Fingerprints hash this many evenly spaced blocks instead of the whole file
+SAMPLE_BLOCKS = 8
+BLOCK_SIZE = 64 * 1024
+
+# Validation results per (dataset, fingerprint), shared by all sessions
+_VALIDATED = {}
+# Sampled fingerprint per path, with the (mtime, size) it was computed for
+_FINGERPRINTS = {}
+# Rows sampled per frame when fingerprinting session_cache arguments
+FINGERPRINT_ROWS = 64
+
+# Prefetched session_cache results by (name, (data version, argument fingerprint))
+_PREFETCHED = {}
+# Set on the prefetch thread, where session_cache publishes results instead of caching them
+_PREFETCH = threading.local()
+# Incrementally maintained results by name, shared by all sessions
+_INCREMENTAL = {}
+_INCREMENTAL_LOCKS = {}
+_INCREMENTAL_LOCK = threading.Lock()
+_MISSING = object()
+# Results shared by all sessions, most recently used last, per cache name
+_SHARED = {}
+_SHARED_LOCKS = {}
+SHARED_CACHE_ENTRIES = 4
+# Parsed partition index per dataset, with the source version it describes
+_PARTITION_INDEXES = {}
+_PARTITION_LOCK = threading.Lock()
+# Per-month rollups by (dataset, month, partition hash, by, aggregations)
+_MONTHLY = {}
+
+def _source_path(dataset):
+    return COST_FILE if dataset == 'cost' else DATASET_FILES[dataset]
+
+def file_fingerprint(path, full=False):
+    """Version id for a file from its mtime, size and a hash of sampled blocks
+
+    With full=True the whole file is hashed instead of the sampled blocks.
+    Sampled fingerprints are reused until the file's mtime or size changes,
+    so repeated calls cost one stat.
+    """
+    stat = os.stat(path)
+    if not full:
+        cached = _FINGERPRINTS.get(path)
+        if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+            return cached[1]
+    digest = hashlib.blake2b(f"{stat.st_mtime_ns}:{stat.st_size}".encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        if full or stat.st_size <= SAMPLE_BLOCKS * BLOCK_SIZE:
+            for block in iter(lambda: f.read(BLOCK_SIZE), b''):
+                digest.update(block)
+        else:
+            step = (stat.st_size - BLOCK_SIZE) // (SAMPLE_BLOCKS - 1)
+            for i in range(SAMPLE_BLOCKS):
+                f.seek(i * step)
+                digest.update(f.read(BLOCK_SIZE))
+    if not full:
+        _FINGERPRINTS[path] = ((stat.st_mtime_ns, stat.st_size), digest.hexdigest())
+    return digest.hexdigest()
+
+def dataset_fingerprint(dataset, full=False):
+    """Fingerprint of one dataset's source file"""
+    return file_fingerprint(_source_path(dataset), full)
+
+def data_version():
+    """Fingerprints of every source file; changes whenever any of them changes"""
+    return tuple(dataset_fingerprint(dataset) for dataset in ['cost'] + list(DATASET_FILES))
+
+def args_fingerprint(value):
+    """Cheap identity of session_cache arguments
+
+    Frames and arrays are identified by shape, schema and a hash of sampled
+    rows, callables by where they are defined, and plain values by value.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        schema = (
+            tuple(zip(value.columns, value.dtypes.astype(str))) if isinstance(value, pd.DataFrame)
+            else (value.name, str(value.dtype))
+        )
+        try:
+            sample = value.iloc[::max(len(value) // FINGERPRINT_ROWS, 1)]
+            digest = int(pd.util.hash_pandas_object(sample).sum())
+        except TypeError:
+            digest = id(value)
+        return (type(value).__name__, value.shape, schema, digest)
+    if isinstance(value, np.ndarray):
+        sample = value.ravel()[::max(value.size // FINGERPRINT_ROWS, 1)]
+        return ('ndarray', value.shape, str(value.dtype), hashlib.blake2b(sample.tobytes(), digest_size=8).hexdigest())
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__,) + tuple(args_fingerprint(item) for item in value)
+    if isinstance(value, dict):
+        return ('dict',) + tuple(sorted((str(key), args_fingerprint(item)) for key, item in value.items()))
+    if isinstance(value, functools.partial):
+        return ('partial', args_fingerprint(value.func), args_fingerprint(value.args), args_fingerprint(value.keywords))
+    if value is None or isinstance(value, (str, int, float, bool, datetime.date, pd.Timestamp, np.generic)):
+        return value
+    if callable(value):
+        code = getattr(value, '__code__', None)
+        return (getattr(value, '__module__', None), getattr(value, '__qualname__', None), code.co_firstlineno if code else None)
+    return (type(value).__qualname__, id(value))
+
+def session_cache(name, build, *args):
+    """Session-cached result of build(*args), rebuilt when the data version or the arguments change"""
+    key = (data_version(), args_fingerprint((build,) + args))
+    if getattr(_PREFETCH, 'active', False):
+        if (name, key) not in _PREFETCHED:
+            store_prefetched(name, key, build(*args))
+        return _PREFETCHED[(name, key)]
+
+    track_session()
+    entry = st.session_state.get(name)
+    hit = entry is not None and entry[0] == key
+    if not hit:
+        # Results computed ahead of time by the background prefetcher count as hits
+        prefetched = _PREFETCHED.get((name, key), _MISSING)
+        hit = prefetched is not _MISSING
+        entry = (key, prefetched if hit else build(*args))
+        st.session_state[name] = entry
+    record_cache(name, hit)
+    return entry[1]
+
+def shared_cache(name, build, *args):
+    """Process-wide result of build(*args), for large objects every session can use as-is
+
+    Keyed like session_cache, but a single copy serves all sessions; the
+    SHARED_CACHE_ENTRIES most recently used results are kept per name.
+    """
+    key = (data_version(), args_fingerprint((build,) + args))
+    with _INCREMENTAL_LOCK:
+        lock = _SHARED_LOCKS.setdefault(name, threading.Lock())
+        entries = _SHARED.setdefault(name, OrderedDict())
+    with lock:
+        hit = key in entries
+        if hit:
+            entries.move_to_end(key)
+        else:
+            entries[key] = build(*args)
+            while len(entries) > SHARED_CACHE_ENTRIES:
+                entries.popitem(last=False)
+        value = entries[key]
+    record_cache(name, hit)
+    return value
+
+@contextmanager
+def prefetching():
+    """Within this block, session_cache calls on this thread publish their results for every session"""
+    _PREFETCH.active = True
     try:
-        cost_data = pd.read_csv("cost_breakdown_data.csv")
-        delivery_data = pd.read_csv("delivery_performance_data.csv")
-        warehouse_data = pd.read_csv("warehouse_turnaround_data.csv")
-        shift_data = pd.read_csv("shift_performance_data.csv")
-        
-        # Convert numeric columns
-        numeric_cols = {
-            'delivery': ['On-Time Deliveries', 'Delayed Deliveries'],
-            'warehouse': ['Average Load Time (mins)', 'Average Unload Time (mins)'],
-            'shift': ['Average Deliveries per Shift', 'Idle Time (hours)']
+        yield
+    finally:
+        _PREFETCH.active = False
+
+def store_prefetched(name, key, value):
+    """Publish a result for session_cache to hand to any session with the same data version and arguments"""
+    _PREFETCHED[(name, key)] = value
+    for stale in [stale for stale in _PREFETCHED if stale[1][0] != key[0]]:
+        _PREFETCHED.pop(stale, None)
+
+def _row_dates(df):
+    return pd.to_datetime(df['Date' if 'Date' in df.columns else 'Month'])
+
+def advance_shared(name, build, update, *frames):
+    """Process-wide result of build(*frames), advanced with update(result, *new_rows) as data arrives
+
+    Each frame's new rows are those dated after the latest date already
+    folded in. When a frame's rows up to that date changed in number (rows
+    removed or back-filled), the result is rebuilt from scratch instead.
+    update works on a copy, so sessions holding the previous result keep a
+    consistent one.
+    """
+    version = data_version()
+    with _INCREMENTAL_LOCK:
+        lock = _INCREMENTAL_LOCKS.setdefault(name, threading.Lock())
+    with lock:
+        entry = _INCREMENTAL.get(name)
+        if entry is not None and entry['version'] == version:
+            return entry['value']
+        dates = [_row_dates(frame) for frame in frames]
+        if entry is None or any(
+            (frame_dates <= latest).sum() != count
+            for frame_dates, latest, count in zip(dates, entry['latest'], entry['counts'])
+        ):
+            value = build(*frames)
+        else:
+            new_rows = [
+                frame[frame_dates > latest if pd.notna(latest) else frame_dates.notna()]
+                for frame, frame_dates, latest in zip(frames, dates, entry['latest'])
+            ]
+            value = update(copy.deepcopy(entry['value']), *new_rows)
+        _INCREMENTAL[name] = {
+            'version': version,
+            'value': value,
+            'latest': [frame_dates.max() for frame_dates in dates],
+            'counts': [int(frame_dates.notna().sum()) for frame_dates in dates]
         }
-        
-        # Convert to numeric and handle errors
-        for col in numeric_cols['delivery']:
-            delivery_data[col] = pd.to_numeric(delivery_data[col], errors='coerce')
-        
-        for col in numeric_cols['warehouse']:
-            warehouse_data[col] = pd.to_numeric(warehouse_data[col], errors='coerce')
-        
-        for col in numeric_cols['shift']:
-            shift_data[col] = pd.to_numeric(shift_data[col], errors='coerce')
-        
-        # Calculate on-time rate
-        delivery_data["On-Time Rate"] = (
-            delivery_data["On-Time Deliveries"] / 
-            (delivery_data["On-Time Deliveries"] + delivery_data["Delayed Deliveries"])
+    return value
+
+def shared_caches():
+    """Process-wide caches, shared by every session"""
+    return {
+        'validated': _VALIDATED, 'prefetched': _PREFETCHED, 'incremental': _INCREMENTAL, 'shared': _SHARED,
+        'fingerprints': _FINGERPRINTS, 'partition_indexes': _PARTITION_INDEXES, 'monthly': _MONTHLY
+    }
+
+def _prepare(dataset, df):
+    """Apply the numeric and date conversions shared by full and partitioned loads"""
+    # Convert to numeric and handle errors
+    for col in VALUE_COLS[dataset]:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # Calculate on-time rate
+    if dataset == 'delivery':
+        df["On-Time Rate"] = (
+            df["On-Time Deliveries"] /
+            (df["On-Time Deliveries"] + df["Delayed Deliveries"])
         ) * 100
-        
-        # Convert dates
-        if 'Date' in delivery_data.columns:
-            delivery_data['Date'] = pd.to_datetime(delivery_data['Date'])
-        
+
+    # Convert dates
+    if 'Date' in df.columns:
+        df['Date'] = pd.to_datetime(df['Date'])
+
+    return df
+
+def _validated(dataset):
+    """Return (clean, quarantine, report) for a dataset, validating each file version once"""
+    key = (dataset, dataset_fingerprint(dataset))
+    record_cache('validated', key in _VALIDATED)
+    if key not in _VALIDATED:
+        _VALIDATED[key] = validate(dataset, pd.read_csv(_source_path(dataset)))
+    return _VALIDATED[key]
+
+def _load_clean(dataset):
+    """Validated rows of a dataset, copied so pages can add columns freely"""
+    clean, _, _ = _validated(dataset)
+    return clean.copy()
+
+def _raw_load_data():
+    """Load and validate data without caching"""
+    start = time.perf_counter()
+    try:
+        cost_data = _load_clean('cost')
+        delivery_data = _prepare('delivery', _load_clean('delivery'))
+        warehouse_data = _prepare('warehouse', _load_clean('warehouse'))
+        shift_data = _prepare('shift', _load_clean('shift'))
+
+        LOAD_SECONDS.observe(time.perf_counter() - start)
+        for dataset, df in zip(['cost'] + list(DATASET_FILES), [cost_data, delivery_data, warehouse_data, shift_data]):
+            record_rows(dataset, len(df))
         return cost_data, delivery_data, warehouse_data, shift_data
-        
+
     except Exception as e:
         st.error(f"Data loading error: {str(e)}")
         return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
 
+def load_validation_report():
+    """Per-check failure counts and the quarantined rows for every dataset"""
+    reports, quarantine = [], {}
+    for dataset in ['cost'] + list(DATASET_FILES):
+        _, bad_rows, report = _validated(dataset)
+        reports.append(report)
+        quarantine[dataset] = bad_rows
+    return pd.concat(reports, ignore_index=True), quarantine
+
 def load_data():
     """Main function to load data with caching"""
-    if 'cached_data' not in st.session_state:
-        st.session_state.cached_data = _raw_load_data()
-    return st.session_state.cached_data
+    return session_cache('cached_data', _raw_load_data)
+
+# --- Month-partitioned storage ---
+
+def _partition_hash(part):
+    return format(int(pd.util.hash_pandas_object(part, index=False).sum()), 'x')
+
+def _write_csv(df, path):
+    """Write df to path atomically, so concurrent readers never see a partial file"""
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    df.to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+def _read_partition_index(path):
+    return pd.read_csv(path, dtype={'Month': str, 'Hash': str, 'Version': str}, parse_dates=['Min Date', 'Max Date'])
+
+def build_partitions(dataset, root=PARTITION_ROOT):
+    """Split a dataset into one CSV per month and write its partition index
+
+    A month whose rows are unchanged keeps its file, so new data only
+    rewrites the months it touches.
+    """
+    df = _load_clean(dataset)
+
+    out_dir = os.path.join(root, dataset)
+    os.makedirs(out_dir, exist_ok=True)
+    index_path = os.path.join(out_dir, PARTITION_INDEX)
+    previous = {}
+    if os.path.exists(index_path):
+        old = _read_partition_index(index_path)
+        if 'Hash' in old.columns:
+            previous = dict(zip(old['Month'], old['Hash']))
+
+    rows = []
+    for month, part in df.groupby(df['Date'].dt.to_period('M'), sort=True):
+        path = os.path.join(out_dir, f"{month}.csv")
+        digest = _partition_hash(part)
+        if previous.get(str(month)) != digest or not os.path.exists(path):
+            _write_csv(part, path)
+        rows.append({
+            'Month': str(month),
+            'Path': path,
+            'Rows': len(part),
+            'Min Date': part['Date'].min(),
+            'Max Date': part['Date'].max(),
+            'Hash': digest
+        })
+
+    index = pd.DataFrame(rows, columns=['Month', 'Path', 'Rows', 'Min Date', 'Max Date', 'Hash'])
+    # Months that no longer have rows
+    for month in set(previous) - set(index['Month']):
+        path = os.path.join(out_dir, f"{month}.csv")
+        if os.path.exists(path):
+            os.remove(path)
+    index['Version'] = dataset_fingerprint(dataset)
+    _write_csv(index, index_path)
+    return index
+
+def load_partition_index(dataset, root=PARTITION_ROOT):
+    """Return the partition index, rebuilding it if the source file has changed"""
+    version = dataset_fingerprint(dataset)
+    cached = _PARTITION_INDEXES.get((root, dataset))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    with _PARTITION_LOCK:
+        index_path = os.path.join(root, dataset, PARTITION_INDEX)
+        index = _read_partition_index(index_path) if os.path.exists(index_path) else None
+        if index is None or 'Hash' not in index.columns or not (index['Version'] == version).all():
+            index = build_partitions(dataset, root)
+        _PARTITION_INDEXES[(root, dataset)] = (version, index)
+    return index
+
+def _read_partitions(dataset, paths):
+    if len(paths) == 0:
+        columns = pd.read_csv(DATASET_FILES[dataset], nrows=0).columns
+        return _prepare(dataset, pd.DataFrame(columns=columns))
+    return _prepare(dataset, pd.concat([pd.read_csv(path) for path in paths], ignore_index=True))
+
+def load_date_range(dataset, start, end, root=PARTITION_ROOT):
+    """Load rows between start and end (inclusive), opening only overlapping partitions"""
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    index = load_partition_index(dataset, root)
+    wanted = index[(index['Max Date'] >= start) & (index['Min Date'] <= end)]
+    df = _read_partitions(dataset, list(wanted['Path']))
+    dates = pd.to_datetime(df['Date'])
+    return df[(dates >= start) & (dates <= end)].reset_index(drop=True)
+
+def load_monthly(dataset, by, aggs, root=PARTITION_ROOT):
+    """Rollup per (by..., Month) computed one month partition at a time
+
+    Each month's rollup is kept under its partition's content hash, so new
+    data only re-reads the months whose rows changed.
+    """
+    index = load_partition_index(dataset, root)
+    spec = (tuple(by), tuple(sorted(aggs.items())))
+    current = {(dataset, month, digest) + spec for month, digest in zip(index['Month'], index['Hash'])}
+    parts = []
+    for month, digest, path in zip(index['Month'], index['Hash'], index['Path']):
+        key = (dataset, month, digest) + spec
+        part = _MONTHLY.get(key)
+        if part is None:
+            part = _read_partitions(dataset, [path]).groupby(list(by)).agg(aggs).reset_index()
+            part.insert(len(by), 'Month', month)
+            _MONTHLY[key] = part
+        parts.append(part)
+    # Rollups of months that changed or disappeared
+    for stale in [key for key in list(_MONTHLY) if key[0] == dataset and key[3:] == spec and key not in current]:
+        _MONTHLY.pop(stale, None)
+    if not parts:
+        return pd.DataFrame(columns=list(by) + ['Month'] + list(aggs))
+    return pd.concat(parts, ignore_index=True).sort_values(list(by) + ['Month'], ignore_index=True)
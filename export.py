@@ -0,0 +1,163 @@
+import os
+import secrets
+import shutil
+import threading
+import time
+import pyarrow as pa
+import pyarrow.parquet as pq
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from utils.memory import live_sessions
+
+# Served by Streamlit's static file handler (server.enableStaticServing)
+EXPORT_DIR = os.path.join("static", "exports")
+EXPORT_URL = "app/static/exports"
+EXPORT_FORMATS = ['CSV', 'Parquet']
+EXPORT_CHUNK_ROWS = 100_000
+# The static file handler refuses files over 200 MB, so larger exports are split into parts
+EXPORT_PART_BYTES = 180 * 2**20
+# Exports are deleted when their session ends, or after this many seconds
+EXPORT_TTL_SECONDS = 3600
+
+# Unguessable export directory and latest job per session id
+_SESSION_DIRS = {}
+_SESSION_JOBS = {}
+_DIRS_LOCK = threading.Lock()
+
+def _with_header(chunks, empty):
+    """Yield empty when chunks is empty, so the file still gets a header"""
+    wrote = False
+    for chunk in chunks:
+        wrote = True
+        yield chunk
+    if not wrote:
+        yield empty
+
+class ExportJob:
+    """Writes the rows selected in a bitmap index to files on a background thread
+
+    Only a single chunk of rows is ever held in memory; the filtered frame
+    is never built. A new part is started before a file would outgrow
+    EXPORT_PART_BYTES. The page polls rows_written, done, error and paths.
+    """
+
+    def __init__(self, index, mask, fmt, name, directory):
+        self.index = index
+        self.mask = mask
+        self.fmt = fmt
+        self.name = name
+        self.directory = directory
+        self.rows = index.count(mask)
+        self.rows_written = 0
+        self.paths = []
+        self.error = None
+        self.done = False
+        self.cancelled = False
+        self._thread = threading.Thread(target=self._run, name='export', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop after the chunk being written and wait for the thread to exit"""
+        self.cancelled = True
+        self._thread.join()
+
+    def _part_path(self):
+        extension = 'parquet' if self.fmt == 'Parquet' else 'csv'
+        path = os.path.join(self.directory, f"{self.name}-part{len(self.paths) + 1}.{extension}")
+        self.paths.append(path)
+        return path
+
+    def _write_csv(self, chunks):
+        f = None
+        try:
+            for chunk in chunks:
+                body = chunk.to_csv(index=False, header=False).encode()
+                if f is None or f.tell() + len(body) > EXPORT_PART_BYTES:
+                    if f is not None:
+                        f.close()
+                    f = open(self._part_path(), 'wb')
+                    f.write(chunk.iloc[:0].to_csv(index=False).encode())
+                f.write(body)
+                self.rows_written += len(chunk)
+        finally:
+            if f is not None:
+                f.close()
+
+    def _write_parquet(self, chunks):
+        writer, last_size = None, 0
+        try:
+            for chunk in chunks:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                # Each chunk becomes one row group of about the size of the previous one
+                if writer is None or os.path.getsize(self.paths[-1]) + last_size > EXPORT_PART_BYTES:
+                    if writer is not None:
+                        writer.close()
+                    writer = pq.ParquetWriter(self._part_path(), writer.schema if writer else table.schema)
+                before = os.path.getsize(self.paths[-1])
+                writer.write_table(table.cast(writer.schema))
+                last_size = os.path.getsize(self.paths[-1]) - before
+                self.rows_written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _run(self):
+        index = self.index
+        chunks = (index.df.iloc[rows] for rows in index.iter_positions(self.mask, EXPORT_CHUNK_ROWS))
+        chunks = _with_header(chunks, index.df.iloc[:0])
+        chunks = (chunk for chunk in chunks if not self.cancelled)
+        try:
+            if self.fmt == 'Parquet':
+                self._write_parquet(chunks)
+            else:
+                self._write_csv(chunks)
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self.done = True
+
+def remove_stale_exports():
+    """Delete the exports of closed sessions, and any older than EXPORT_TTL_SECONDS"""
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    live = {session_id for session_id, _ in live_sessions()}
+    cutoff = time.time() - EXPORT_TTL_SECONDS
+    with _DIRS_LOCK:
+        for session_id in [session_id for session_id in _SESSION_DIRS if session_id not in live]:
+            del _SESSION_DIRS[session_id]
+            job = _SESSION_JOBS.pop(session_id, None)
+            if job is not None:
+                job.cancelled = True
+        owned = set(_SESSION_DIRS.values())
+        for name in os.listdir(EXPORT_DIR):
+            path = os.path.join(EXPORT_DIR, name)
+            if name not in owned or os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+def start_export(index, mask, fmt, name):
+    """Start writing the selected rows into this session's export directory
+
+    The directory name is a random token, so its URLs cannot be guessed, and
+    the session's previous export is replaced.
+    """
+    remove_stale_exports()
+    ctx = get_script_run_ctx()
+    session_id = ctx.session_id if ctx is not None else None
+    with _DIRS_LOCK:
+        token = _SESSION_DIRS.setdefault(session_id, secrets.token_hex(16))
+        previous = _SESSION_JOBS.pop(session_id, None)
+    if previous is not None:
+        previous.cancel()
+    directory = os.path.join(EXPORT_DIR, token)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    job = ExportJob(index, mask, fmt, name, directory).start()
+    with _DIRS_LOCK:
+        _SESSION_JOBS[session_id] = job
+    return job
+
+def export_url(path):
+    """Relative URL the browser downloads an export part from"""
+    return f"{EXPORT_URL}/{os.path.basename(os.path.dirname(path))}/{os.path.basename(path)}"
@@ -0,0 +1,116 @@
+from functools import partial
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from utils.data_loader import advance_shared, session_cache
+
+PROCESSING_COLS = ['Average Load Time (mins)', 'Average Unload Time (mins)']
+
+class FixedHistogram:
+    """Bin counts over equal-width edges that new values can be added to"""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    def extend(self, low, high):
+        """Add bins of the same width on either side until low..high is covered
+
+        Existing edges are kept, so the counts already binned stay exact.
+        """
+        width = self.edges[1] - self.edges[0]
+        below = int(np.ceil((self.edges[0] - low) / width)) if low < self.edges[0] else 0
+        above = int(np.ceil((high - self.edges[-1]) / width)) if high > self.edges[-1] else 0
+        if below or above:
+            self.edges = np.concatenate([
+                self.edges[0] - width * np.arange(below, 0, -1),
+                self.edges,
+                self.edges[-1] + width * np.arange(1, above + 1)
+            ])
+            self.counts = np.concatenate([
+                np.zeros(below, dtype=np.int64), self.counts, np.zeros(above, dtype=np.int64)
+            ])
+        return self
+
+    def update(self, values):
+        """Add values, growing the edges first if any fall outside them"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.extend(values.min(), values.max())
+        self.counts += np.histogram(values, bins=self.edges)[0]
+        return self
+
+    @property
+    def centers(self):
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+    @property
+    def widths(self):
+        return np.diff(self.edges)
+
+def bin_edges(values, nbins):
+    """Equal-width edges spanning the values"""
+    return np.histogram_bin_edges(np.asarray(values, dtype=float), bins=nbins)
+
+def histogram(values, nbins):
+    return FixedHistogram(bin_edges(values, nbins)).update(values)
+
+class WarehouseHistograms:
+    """Load and unload time histograms per warehouse, all on one grid of bins
+
+    Every histogram starts from the same edges and grows by whole bins, so
+    overlaid warehouses stay aligned.
+    """
+
+    def __init__(self, edges):
+        self.edges = edges
+        self.by_warehouse = {}
+
+    def update(self, rows):
+        """Add new rows, creating histograms for warehouses not seen before"""
+        for warehouse, group in rows.groupby('Warehouse ID'):
+            if warehouse not in self.by_warehouse:
+                self.by_warehouse[warehouse] = {col: FixedHistogram(self.edges[col]) for col in PROCESSING_COLS}
+            for col in PROCESSING_COLS:
+                self.by_warehouse[warehouse][col].update(group[col].to_numpy())
+        return self
+
+    def get(self, warehouse):
+        return self.by_warehouse.get(warehouse)
+
+def warehouse_histograms(warehouse_data, nbins):
+    edges = {col: bin_edges(warehouse_data[col], nbins) for col in PROCESSING_COLS}
+    return WarehouseHistograms(edges).update(warehouse_data)
+
+def column_histogram(df, col, nbins):
+    return histogram(df[col], nbins)
+
+def load_histogram(name, df, col, nbins):
+    """Histogram of df[col]; new rows are added to the existing bins as data arrives"""
+    name = f'histogram_{name}_{nbins}'
+    update = lambda hist, rows: hist.update(rows[col])
+    return session_cache(name, advance_shared, name, partial(column_histogram, col=col, nbins=nbins), update, df)
+
+def load_warehouse_histograms(warehouse_data, nbins):
+    """Per-warehouse histograms; new rows are added to the existing bins as data arrives"""
+    name = f'warehouse_histograms_{nbins}'
+    update = lambda hists, rows: hists.update(rows)
+    return session_cache(name, advance_shared, name, partial(warehouse_histograms, nbins=nbins), update, warehouse_data)
+
+def histogram_figure(hists, title, x_label, colors=None, barmode='overlay'):
+    """Bar chart of precomputed bin counts, one trace per histogram"""
+    colors = colors or px.colors.qualitative.Plotly
+    fig = go.Figure([
+        go.Bar(
+            x=hist.centers,
+            y=hist.counts,
+            width=hist.widths,
+            name=str(name),
+            marker_color=colors[i % len(colors)],
+            opacity=0.6 if barmode == 'overlay' and len(hists) > 1 else 1
+        )
+        for i, (name, hist) in enumerate(hists.items())
+    ])
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title='count', barmode=barmode, bargap=0)
+    return fig
@@ -0,0 +1,209 @@
+"""Concurrent-session load test for the dashboard pages.
+
+Simulates N sessions in one process with Streamlit's headless AppTest,
+each visiting the pages in turn and replaying typical widget interactions
+against generated data. Reports rerun latency percentiles, throughput and
+resident memory (total and per session).
+
+Run it from the repo root, the directory the app is started from, with this
+package importable as `utils` just as the pages need it:
+
+    python load_test.py --sessions 50 --days 1825 --warehouses 200
+
+Root_Cause.py fails on any tree under pandas >= 3 (its sample schedule uses
+freq='M', which pandas no longer accepts); the summary flags that page's
+errors as a known issue rather than a load failure.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+PAGES = ['Home.py', 'Overview.py', 'Data_Analysis.py', 'Root_Cause.py', 'Interactive.py']
+# Pages that fail independently of load, with the reason reported next to their errors
+KNOWN_ISSUES = {
+    'Root_Cause.py': "pd.date_range(freq='M') is rejected by pandas >= 3; fails without load too"
+}
+REGIONS = ['North', 'South', 'East', 'West', 'Central']
+SHIFT_TYPES = ['Day Shift', 'Night Shift']
+
+def generate_data(out_dir, days=365, warehouses=9, seed=0):
+    """Write the four source CSVs with the production schema into out_dir"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-01', periods=days, freq='D')
+
+    def daily(keys):
+        return pd.MultiIndex.from_product([dates, keys]).to_frame(index=False)
+
+    delivery = daily(REGIONS).set_axis(['Date', 'Region'], axis=1)
+    delivery['On-Time Deliveries'] = rng.integers(50, 200, len(delivery))
+    delivery['Delayed Deliveries'] = rng.integers(5, 50, len(delivery))
+
+    warehouse = daily(range(1, warehouses + 1)).set_axis(['Date', 'Warehouse ID'], axis=1)
+    warehouse['Average Load Time (mins)'] = rng.integers(30, 120, len(warehouse))
+    warehouse['Average Unload Time (mins)'] = rng.integers(30, 120, len(warehouse))
+
+    shift = daily(SHIFT_TYPES).set_axis(['Date', 'Shift Type'], axis=1)
+    shift['Average Deliveries per Shift'] = rng.integers(50, 150, len(shift))
+    shift['Idle Time (hours)'] = rng.integers(1, 5, len(shift))
+
+    months = pd.date_range(dates[0], dates[-1], freq='MS')
+    cost = pd.DataFrame({
+        'Month': months,
+        'Fuel Cost': rng.integers(80_000, 190_000, len(months)),
+        'Maintenance Cost': rng.integers(35_000, 145_000, len(months))
+    })
+
+    for name, df in [
+        ('cost_breakdown_data.csv', cost),
+        ('delivery_performance_data.csv', delivery),
+        ('warehouse_turnaround_data.csv', warehouse),
+        ('shift_performance_data.csv', shift)
+    ]:
+        df.to_csv(os.path.join(out_dir, name), index=False, date_format='%Y-%m-%d')
+
+def _random_range(at, rng):
+    """A 1-week to 1-year window somewhere in the slider's full range"""
+    low, high = at.slider[0].value
+    start = low + timedelta(days=rng.randrange((high - low).days + 1))
+    return start, min(high, start + timedelta(days=rng.choice([7, 30, 90, 365])))
+
+def _interactive_steps(at, rng):
+    """Region, date-range, granularity and warehouse changes in the explorer"""
+    yield lambda: at.multiselect[0].set_value(rng.sample(REGIONS, rng.randint(1, len(REGIONS))))
+    yield lambda: at.slider[0].set_value(_random_range(at, rng))
+    yield lambda: at.radio[0].set_value(rng.choice(['Auto', 'Day', 'Week', 'Month']))
+    yield lambda: at.selectbox(key='warehouse_select').select_index(
+        rng.randrange(len(at.selectbox(key='warehouse_select').options))
+    )
+
+def _refresh(at, rng):
+    """A user reloading a page without touching any widget"""
+    yield lambda: None
+
+# Interactions replayed after each page's first render
+SCENARIOS = {
+    'Home.py': _refresh,
+    'Overview.py': _refresh,
+    'Data_Analysis.py': _refresh,
+    'Root_Cause.py': _refresh,
+    'Interactive.py': _interactive_steps
+}
+
+def _timed_run(at, latencies, errors, page):
+    start = time.perf_counter()
+    at.run()
+    latencies.append((page, time.perf_counter() - start))
+    if at.exception:
+        errors.append((page, at.exception[0].value.splitlines()[0]))
+
+def run_session(session_id, root, pages, timeout):
+    """Visit every page once, carrying session state across pages like a browser tab"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(session_id)
+    latencies, errors, state = [], [], {}
+    for page in pages:
+        at = AppTest.from_file(os.path.join(root, page), default_timeout=timeout)
+        for key, value in state.items():
+            try:
+                at.session_state[key] = value
+            except Exception:
+                # Some widget state (e.g. chart selections) cannot be preset
+                pass
+        _timed_run(at, latencies, errors, page)
+        for step in SCENARIOS.get(page, _refresh)(at, rng):
+            try:
+                step()
+            except Exception as e:
+                errors.append((page, f"interaction failed: {e}"))
+                break
+            _timed_run(at, latencies, errors, page)
+        state = dict(at.session_state.items())
+    return latencies, errors, state
+
+def run_load_test(sessions, pages=PAGES, days=365, warehouses=9, timeout=300, root=None):
+    """Drive `sessions` concurrent sessions and return a summary dict
+
+    Pages are resolved against root (the current directory by default); the
+    generated data lives in a temporary directory removed afterwards.
+    """
+    root = os.path.abspath(root or os.getcwd())
+    try:
+        from utils.memory import deep_size, rss_bytes
+    except ImportError:
+        sys.exit("load_test: `utils` is not importable; run it where the app's pages can import `utils`")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='loadtest-data-') as data_dir:
+        generate_data(data_dir, days, warehouses)
+        # The loader reads the CSVs (and writes partitions) relative to the working directory
+        os.chdir(data_dir)
+        try:
+            rss_before = rss_bytes()
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=sessions) as pool:
+                results = list(pool.map(lambda i: run_session(i, root, pages, timeout), range(sessions)))
+            elapsed = time.perf_counter() - start
+            rss_after = rss_bytes()
+        finally:
+            os.chdir(cwd)
+
+    latencies = [item for result in results for item in result[0]]
+    errors = [item for result in results for item in result[1]]
+    durations = np.array([seconds for _, seconds in latencies])
+
+    by_page = {}
+    for page in pages:
+        page_durations = np.array([seconds for name, seconds in latencies if name == page])
+        by_page[page] = {
+            'reruns': len(page_durations),
+            'p50_ms': float(np.percentile(page_durations, 50) * 1000) if len(page_durations) else None,
+            'p95_ms': float(np.percentile(page_durations, 95) * 1000) if len(page_durations) else None,
+            'errors': sum(1 for name, _ in errors if name == page),
+            'known_issue': KNOWN_ISSUES.get(page)
+        }
+
+    return {
+        'sessions': sessions,
+        'rows': {'delivery': days * len(REGIONS), 'warehouse': days * warehouses, 'shift': days * len(SHIFT_TYPES)},
+        'reruns': len(durations),
+        'p50_ms': float(np.percentile(durations, 50) * 1000),
+        'p95_ms': float(np.percentile(durations, 95) * 1000),
+        'p99_ms': float(np.percentile(durations, 99) * 1000),
+        'throughput_reruns_per_s': len(durations) / elapsed,
+        'wall_time_s': elapsed,
+        'rss_total_mb': rss_after / 2**20,
+        'rss_growth_per_session_mb': (rss_after - rss_before) / sessions / 2**20,
+        'session_state_mb': float(np.mean([deep_size(result[2]) for result in results]) / 2**20),
+        'pages': by_page,
+        'errors': sorted(set(error for error in errors if error[0] not in KNOWN_ISSUES))[:20]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=10, help='concurrent simulated sessions')
+    parser.add_argument('--days', type=int, default=365, help='days of generated history')
+    parser.add_argument('--warehouses', type=int, default=9, help='generated warehouse count')
+    parser.add_argument('--pages', nargs='+', default=PAGES, help='pages to visit, in order')
+    parser.add_argument('--root', help='repo root the pages are read from (default: current directory)')
+    parser.add_argument('--timeout', type=float, default=300, help='per-rerun timeout in seconds')
+    parser.add_argument('--json', help='also write the summary to this file')
+    args = parser.parse_args()
+
+    summary = run_load_test(args.sessions, args.pages, args.days, args.warehouses, args.timeout, args.root)
+    print(json.dumps(summary, indent=2, default=str))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2, default=str)
+
+if __name__ == '__main__':
+    main()
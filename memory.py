@@ -0,0 +1,168 @@
+import sys
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Session states by session id, pruned against the runtime's live sessions
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+# Hit and miss counts per cache name, across all sessions
+_CACHE_STATS = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_STATS_LOCK = threading.Lock()
+
+def track_session():
+    """Register the running session so its state can be measured"""
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        with _SESSIONS_LOCK:
+            _SESSIONS[ctx.session_id] = ctx.session_state
+
+def _active_session_ids():
+    """Ids of the sessions connected to the runtime, or None when that is unknown
+
+    Streamlit has no public API for this, so the runtime's private session
+    manager is read defensively: outside a running server, under a test
+    harness's stand-in runtime or after an upgrade changes its internals, the
+    answer degrades to unknown instead of raising.
+    """
+    if not Runtime.exists():
+        return None
+    session_mgr = getattr(Runtime.instance(), '_session_mgr', None)
+    list_active = getattr(session_mgr, 'list_active_sessions', None)
+    if list_active is None:
+        return None
+    try:
+        return {info.session.id for info in list_active()}
+    except AttributeError:
+        return None
+
+def live_sessions():
+    """(session id, session state) of every tracked session still connected
+
+    When the connected sessions are unknown, every tracked session is returned.
+    """
+    live = _active_session_ids()
+    with _SESSIONS_LOCK:
+        if live is not None:
+            for session_id in [session_id for session_id in _SESSIONS if session_id not in live]:
+                del _SESSIONS[session_id]
+        return list(_SESSIONS.items())
+
+def record_cache(name, hit):
+    with _STATS_LOCK:
+        _CACHE_STATS[name]['hits' if hit else 'misses'] += 1
+
+def cache_stats():
+    """Hit and miss counts per cache name"""
+    with _STATS_LOCK:
+        return {name: dict(stats) for name, stats in _CACHE_STATS.items()}
+
+def session_count():
+    """Sessions connected to the runtime, or None when that is unknown"""
+    live = _active_session_ids()
+    return len(live) if live is not None else None
+
+def deep_size(obj, seen=None):
+    """Bytes held by the DataFrames and arrays reachable from obj"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(deep_size(value, seen) for value in obj.values())
+    if isinstance(obj, (list, tuple, set)):
+        return sum(deep_size(value, seen) for value in obj)
+    if hasattr(obj, '__dict__'):
+        return deep_size(vars(obj), seen)
+    return sys.getsizeof(obj)
+
+def rss_bytes():
+    """Resident set size of this process (Linux)"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+def _frames(obj, seen=None):
+    """Every DataFrame reachable from obj"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return
+    seen.add(id(obj))
+    if isinstance(obj, pd.DataFrame):
+        yield obj
+    elif isinstance(obj, dict):
+        for value in obj.values():
+            yield from _frames(value, seen)
+    elif isinstance(obj, (list, tuple, set)):
+        for value in obj:
+            yield from _frames(value, seen)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, (pd.Series, pd.Index, np.ndarray)):
+        yield from _frames(vars(obj), seen)
+
+def _content_key(df):
+    """Identifies frames with identical contents held as separate copies"""
+    try:
+        return (df.shape, tuple(df.columns), int(pd.util.hash_pandas_object(df, index=False).sum()))
+    except TypeError:
+        return (df.shape, tuple(df.columns), id(df))
+
+def memory_report(shared_caches=None):
+    """Per-session and per-object memory, duplicated frames and cache hit ratios"""
+    sessions, objects = [], []
+    frame_owners = defaultdict(set)
+    frame_sizes = {}
+
+    for session_id, state in live_sessions():
+        user_state = dict(state.filtered_state)
+        total = 0
+        for key, value in user_state.items():
+            size = deep_size(value)
+            total += size
+            objects.append({'Session': session_id[:8], 'Object': key, 'Type': type(value).__name__, 'MB': size / 2**20})
+        for frame in _frames(user_state):
+            content = _content_key(frame)
+            frame_owners[content].add((session_id, id(frame)))
+            frame_sizes[content] = int(frame.memory_usage(deep=True).sum())
+        sessions.append({'Session': session_id[:8], 'Objects': len(user_state), 'MB': total / 2**20})
+
+    # A frame counts as duplicated when separate copies of it live in several sessions
+    duplicated = {
+        content: owners for content, owners in frame_owners.items()
+        if len({session for session, _ in owners}) > 1 and len({frame for _, frame in owners}) > 1
+    }
+    duplicate_mb = sum(frame_sizes[c] * (len({f for _, f in o}) - 1) for c, o in duplicated.items()) / 2**20
+
+    caches = [
+        {'Cache': name, 'Hits': stats['hits'], 'Misses': stats['misses'],
+         'Hit Ratio': stats['hits'] / (stats['hits'] + stats['misses'])}
+        for name, stats in sorted(cache_stats().items())
+    ]
+    shared = [
+        {'Cache': name, 'Entries': len(cache), 'MB': deep_size(cache) / 2**20}
+        for name, cache in (shared_caches or {}).items()
+    ]
+
+    active = session_count()
+    return {
+        'process_rss_mb': rss_bytes() / 2**20,
+        'active_sessions': active if active is not None else 'unknown',
+        'sessions': sessions,
+        'objects': objects,
+        'duplicated_frames': len(duplicated),
+        'duplicated_frame_copies_mb': duplicate_mb,
+        'session_caches': caches,
+        'shared_caches': shared
+    }
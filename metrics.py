@@ -0,0 +1,194 @@
+import functools
+import logging
+import os
+import tempfile
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.memory import cache_stats, session_count
+
+logger = logging.getLogger(__name__)
+
+# Serve /metrics on 127.0.0.1:<port> when set
+METRICS_PORT = os.environ.get("DASHBOARD_METRICS_PORT")
+# Rewrite this text-exposition file every METRICS_FILE_INTERVAL seconds when set
+METRICS_FILE = os.environ.get("DASHBOARD_METRICS_FILE")
+METRICS_FILE_INTERVAL = 15
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+SECONDS_BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+BYTES_BUCKETS = [1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000]
+
+_LOCK = threading.Lock()
+_started = False
+# The page run open on each script thread
+_RUN = threading.local()
+
+class Histogram:
+    """Cumulative-bucket histogram per label value, in Prometheus form"""
+
+    def __init__(self, name, help_text, buckets, label=None):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label = label
+        self.series = {}
+
+    def observe(self, value, label_value=None):
+        with _LOCK:
+            counts, total = self.series.get(label_value, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect_left(self.buckets, value)] += 1
+            self.series[label_value] = (counts, total + value)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with _LOCK:
+            series = {key: (list(counts), total) for key, (counts, total) in self.series.items()}
+        for label_value, (counts, total) in sorted(series.items(), key=lambda item: str(item[0])):
+            prefix = f'{self.label}="{_escape(label_value)}",' if self.label else ''
+            cumulative = 0
+            for bound, count in zip(self.buckets + ['+Inf'], counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            labels = f'{{{prefix[:-1]}}}' if prefix else ''
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+LOAD_SECONDS = Histogram(
+    'dashboard_load_data_seconds', 'Time to load and validate all datasets (_raw_load_data).', SECONDS_BUCKETS
+)
+RERUN_SECONDS = Histogram(
+    'dashboard_page_rerun_seconds', 'Full script rerun time per page.', SECONDS_BUCKETS, label='page'
+)
+FRAGMENT_SECONDS = Histogram(
+    'dashboard_fragment_run_seconds', 'Run time per fragment, in full reruns and fragment reruns.',
+    SECONDS_BUCKETS, label='fragment'
+)
+FIGURE_BYTES = Histogram(
+    'dashboard_figure_payload_bytes', 'Serialized Plotly figure size sent to the browser.', BYTES_BUCKETS
+)
+
+# Latest row count per dataset
+_ROWS = {}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def record_rows(dataset, rows):
+    with _LOCK:
+        _ROWS[dataset] = rows
+
+class _PageRun:
+    """Held only by the script thread's locals, so it is released when that thread exits"""
+
+def _observe_since(start, page):
+    RERUN_SECONDS.observe(time.perf_counter() - start, page)
+
+def start_page(page):
+    """Call at the top of a page script; its rerun time is recorded once, when the run ends
+
+    finish_page() at the bottom records a run that completes. A run ended
+    early by st.stop(), an exception or a new rerun is recorded when its
+    script thread exits or the next page run on the thread starts.
+    """
+    start_exporter()
+    finish_page()
+    _RUN.run = _PageRun()
+    _RUN.finish = weakref.finalize(_RUN.run, _observe_since, time.perf_counter(), page)
+
+def finish_page():
+    """Record this thread's open page run, if any"""
+    finish = getattr(_RUN, 'finish', None)
+    if finish is not None:
+        # A finalizer runs at most once, so a later exit of the thread records nothing
+        finish()
+        _RUN.finish = _RUN.run = None
+
+def timed_fragment(func):
+    """Place under @st.fragment so fragment reruns, which skip the page body, are timed too"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            FRAGMENT_SECONDS.observe(time.perf_counter() - start, func.__name__)
+    return wrapper
+
+def render_metrics():
+    """All series in the Prometheus text exposition format"""
+    lines = []
+    for histogram in (LOAD_SECONDS, RERUN_SECONDS, FRAGMENT_SECONDS, FIGURE_BYTES):
+        lines += histogram.render()
+
+    with _LOCK:
+        rows = dict(_ROWS)
+    lines += ['# HELP dashboard_rows_loaded Rows loaded per dataset after validation.', '# TYPE dashboard_rows_loaded gauge']
+    lines += [f'dashboard_rows_loaded{{dataset="{_escape(name)}"}} {count}' for name, count in sorted(rows.items())]
+
+    stats = cache_stats()
+    for kind in ('hits', 'misses'):
+        name = f'dashboard_cache_{kind}_total'
+        lines += [f'# HELP {name} Cache {kind} per cache.', f'# TYPE {name} counter']
+        lines += [f'{name}{{cache="{_escape(cache)}"}} {counts[kind]}' for cache, counts in sorted(stats.items())]
+
+    # NaN when the runtime does not expose its sessions
+    sessions = session_count()
+    lines += [
+        '# HELP dashboard_active_sessions Browser sessions currently connected.',
+        '# TYPE dashboard_active_sessions gauge',
+        f'dashboard_active_sessions {sessions if sessions is not None else "NaN"}'
+    ]
+    return '\n'.join(lines) + '\n'
+
+def write_metrics_file(path):
+    """Atomically replace path with the current metrics"""
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as f:
+        f.write(render_metrics())
+    os.replace(f.name, path)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def _write_periodically(path):
+    while True:
+        try:
+            write_metrics_file(path)
+        except OSError:
+            logger.exception("Could not write metrics to %s", path)
+        time.sleep(METRICS_FILE_INTERVAL)
+
+def start_exporter(port=METRICS_PORT, path=METRICS_FILE):
+    """Start the HTTP endpoint and/or file writer once per process, as configured"""
+    global _started
+    with _LOCK:
+        if _started:
+            return
+        _started = True
+    if port:
+        try:
+            server = ThreadingHTTPServer(('127.0.0.1', int(port)), _MetricsHandler)
+        except OSError:
+            # Another process (e.g. a second app instance) already serves this port
+            logger.exception("Metrics endpoint could not bind port %s", port)
+        else:
+            threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    if path:
+        threading.Thread(target=_write_periodically, args=(path,), name='metrics-file', daemon=True).start()
@@ -0,0 +1,40 @@
+import pandas as pd
+from utils.validation import SHIFT_HOURS
+
+# Each page's frames are prepared here, before any cached call, so the page and
+# the background prefetch pass identical frames to the same loaders. The
+# loaded frames are shared by every page of a session, so these work on copies.
+
+PROCESSING_COLS = ['Average Load Time (mins)', 'Average Unload Time (mins)']
+
+def prepare_overview(cost_data):
+    """Cost rows with a datetime Month and each cost's share of the total"""
+    cost = cost_data.copy()
+    if 'Month' in cost.columns:
+        cost['Month'] = pd.to_datetime(cost['Month'])
+    cost['Total Cost'] = cost['Fuel Cost'] + cost['Maintenance Cost']
+    cost['Fuel %'] = (cost['Fuel Cost'] / cost['Total Cost']) * 100
+    cost['Maintenance %'] = (cost['Maintenance Cost'] / cost['Total Cost']) * 100
+    return cost
+
+def _add_utilization(shift):
+    shift['Utilization'] = (1 - (shift['Idle Time (hours)'] / SHIFT_HOURS)) * 100
+
+def prepare_analysis(delivery_data, warehouse_data, shift_data):
+    """Frames with a Month column, the on-time rate and shift utilization"""
+    delivery, warehouse, shift = delivery_data.copy(), warehouse_data.copy(), shift_data.copy()
+    delivery['On-Time Rate'] = (delivery['On-Time Deliveries'] /
+                                (delivery['On-Time Deliveries'] + delivery['Delayed Deliveries'])) * 100
+    for df in (delivery, warehouse, shift):
+        df['Month'] = df['Date'].dt.to_period('M').astype(str)
+    _add_utilization(shift)
+    shift['Theoretical Capacity'] = shift['Average Deliveries per Shift'] / (1 - (shift['Idle Time (hours)'] / SHIFT_HOURS))
+    shift['Utilization %'] = (shift['Average Deliveries per Shift'] / shift['Theoretical Capacity']) * 100
+    return delivery, warehouse, shift
+
+def prepare_root_cause(warehouse_data, shift_data):
+    """Warehouse rows with their combined processing time, shift rows with utilization"""
+    warehouse, shift = warehouse_data.copy(), shift_data.copy()
+    warehouse['Combined Time'] = warehouse[PROCESSING_COLS[0]] + warehouse[PROCESSING_COLS[1]]
+    _add_utilization(shift)
+    return warehouse, shift
@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from utils.bitmap_index import load_range_index
+from utils.data_loader import shared_cache
+
+PAGE_SIZES = [25, 50, 100, 250]
+# Filtered orderings kept per table (most recently used first out)
+MAX_CACHED_VIEWS = 8
+
+class PagedTable:
+    """Serves one page of a large frame at a time, sorted and filtered on the server
+
+    A sort permutation is computed once per column and reused. A filtered
+    ordering is that permutation with the non-matching rows dropped; a page
+    is a slice of it, so only the visible rows are ever copied out of df.
+    Filters are bitwise ANDs over the bitmap index the table reads its rows
+    from. Tables are shared by all sessions, so their caches are locked.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.df = index.df
+        self._orders = {}
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def order(self, col):
+        """Row positions sorted ascending by col (missing values last), cached per column"""
+        if col not in self._orders:
+            values = self.df[col]
+            if pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_any_dtype(values):
+                keys = values.to_numpy(dtype=float if pd.api.types.is_numeric_dtype(values) else 'datetime64[ns]')
+            else:
+                codes, uniques = pd.factorize(values, sort=True)
+                keys = np.where(codes < 0, len(uniques), codes)
+            self._orders[col] = np.argsort(keys, kind='stable')
+        return self._orders[col]
+
+    def mask(self, filters=None):
+        """Rows whose columns take one of the given values ({column: values})"""
+        return self.index.bits(self.index.select(filters))
+
+    def view(self, sort_col, descending=False, filters=None):
+        """Ordered positions of the matching rows, cached for the most recent requests"""
+        key = (sort_col, descending, tuple(sorted((col, tuple(values)) for col, values in (filters or {}).items())))
+        with self._lock:
+            if key in self._views:
+                self._views.move_to_end(key)
+                return self._views[key]
+            order = self.order(sort_col)
+            if descending:
+                # Keep missing values last when reversing
+                missing = self.df[sort_col].isna().to_numpy()[order]
+                order = np.concatenate([order[~missing][::-1], order[missing]])
+            positions = order[self.mask(filters)[order]]
+            self._views[key] = positions
+            if len(self._views) > MAX_CACHED_VIEWS:
+                self._views.popitem(last=False)
+            return positions
+
+    def page(self, positions, page, page_size):
+        """Rows of one page of a view, page numbers starting at 1"""
+        first = (page - 1) * page_size
+        return self.df.iloc[positions[first:first + page_size]]
+
+def _range_table(dataset, start, end, key_col):
+    return PagedTable(load_range_index(dataset, start, end, [key_col]))
+
+def load_range_table(dataset, start, end, key_col):
+    """Paged table over a dataset's rows dated start..end, shared by all sessions
+
+    Its rows are the date-sorted copy held by the range's bitmap index, so
+    the table adds only its sort orders.
+    """
+    return shared_cache(f'paged_table_{dataset}', _range_table, dataset, start, end, key_col)
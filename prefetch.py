@@ -0,0 +1,119 @@
+import logging
+import os
+import threading
+
+import pandas as pd
+from utils.aggregates import load_cost_efficiency, load_day_grid, load_period_totals, load_rate_series
+from utils.alerts import load_alerts
+from utils.bitmap_index import load_range_index
+from utils.bootstrap import load_bootstrap_ci
+from utils.data_loader import _raw_load_data, data_version, load_partition_index, prefetching
+from utils.histograms import load_histogram, load_warehouse_histograms
+from utils.page_data import prepare_analysis, prepare_overview, prepare_root_cause
+from utils.rankings import load_region_ranking, load_shift_ranking, load_warehouse_ranking
+from utils.risk import load_delay_risk
+from utils.simulation import load_empirical_times
+from utils.sketches import load_column_sketches, load_group_sketches
+from utils.staffing import FLEX_SHARE, load_schedule
+
+logger = logging.getLogger(__name__)
+
+# Added to the worker thread's nice value so page reruns keep priority
+PREFETCH_NICENESS = 10
+
+# The running or finished prefetch thread and the data version it covers
+_worker = None
+_worker_version = None
+_worker_lock = threading.Lock()
+
+def prefetch_jobs(cost_data, delivery_data, warehouse_data, shift_data):
+    """(loader, args) for each page's cached computations, likeliest page first
+
+    The loaders are the pages' own load_* functions, called with frames
+    from the pages' own prepare_* functions. session_cache
+    keys on the arguments too, so a call that drifts from its page only
+    misses the prefetched result; it never serves a different one.
+    """
+    load_cols = ['Average Load Time (mins)', 'Average Unload Time (mins)']
+    delivery_cols = ['On-Time Deliveries', 'Delayed Deliveries']
+
+    # Overview
+    cost = prepare_overview(cost_data)
+    jobs = [
+        (load_period_totals, (cost, delivery_data, warehouse_data)),
+        (load_cost_efficiency, (cost, delivery_data)),
+        (load_warehouse_ranking, (warehouse_data,)),
+        (load_alerts, (delivery_data, warehouse_data, shift_data))
+    ]
+
+    # Deep Analysis
+    delivery, warehouse, shift = prepare_analysis(delivery_data, warehouse_data, shift_data)
+    jobs += [
+        (load_bootstrap_ci, ('regional_on_time', delivery, ['Region'], 'On-Time Rate')),
+        (load_bootstrap_ci, ('monthly_on_time', delivery, ['Month', 'Region'], 'On-Time Rate')),
+        (load_day_grid, ('delivery', delivery, 'Region', delivery_cols)),
+        (load_column_sketches, ('processing_times', warehouse, load_cols)),
+        (load_group_sketches, ('shift_productivity', shift, 'Shift Type', 'Average Deliveries per Shift')),
+        (load_day_grid, ('shift', shift, 'Shift Type', ['Average Deliveries per Shift'])),
+        (load_group_sketches, ('shift_utilization', shift, 'Shift Type', 'Utilization %')),
+        (load_delay_risk, (delivery, warehouse, shift))
+    ]
+
+    # Root Cause
+    warehouse, shift = prepare_root_cause(warehouse_data, shift_data)
+    jobs += [
+        (load_histogram, ('combined_time', warehouse, 'Combined Time', 20)),
+        (load_warehouse_ranking, (warehouse,)),
+        (load_empirical_times, (warehouse,)),
+        (load_shift_ranking, (shift,)),
+        (load_region_ranking, (delivery_data,))
+    ]
+
+    # Data Explorer (WAREHOUSE_HIST_BINS in Interactive.py), over the slider's default full range
+    partition_index = load_partition_index('delivery')
+    start, end = pd.Timestamp(partition_index['Min Date'].min().date()), pd.Timestamp(partition_index['Max Date'].max().date())
+    jobs += [
+        (load_range_index, ('delivery', start, end, ['Region'])),
+        (load_rate_series, (delivery_data,)),
+        (load_day_grid, ('delivery', delivery_data, 'Region', delivery_cols)),
+        (load_day_grid, ('shift', shift_data, 'Shift Type', ['Average Deliveries per Shift'])),
+        (load_warehouse_histograms, (warehouse_data, 20))
+    ]
+
+    # Solutions
+    jobs.append((load_schedule, (delivery_data, shift_data, FLEX_SHARE)))
+    return jobs
+
+def _lower_priority():
+    try:
+        # On Linux the nice value of a thread id applies to that thread only
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), os.getpriority(os.PRIO_PROCESS, 0) + PREFETCH_NICENESS)
+    except (AttributeError, OSError):
+        pass
+
+def run_prefetch(version):
+    """Run every prefetch job for one data version, publishing the results"""
+    _lower_priority()
+    frames = _raw_load_data()
+    if any(frame.empty for frame in frames):
+        return
+    with prefetching():
+        for loader, args in prefetch_jobs(*frames):
+            # Stop early if the data changed underneath us
+            if data_version() != version:
+                return
+            try:
+                loader(*args)
+            except Exception:
+                logger.exception("Prefetch with %s failed", loader.__name__)
+
+def start_prefetch():
+    """Start the background prefetch for the current data version, unless one already ran"""
+    global _worker, _worker_version
+    version = data_version()
+    with _worker_lock:
+        if _worker_version != version:
+            _worker = threading.Thread(target=run_prefetch, args=(version,), name='prefetch', daemon=True)
+            _worker_version = version
+            _worker.start()
+    return _worker
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+from utils.data_loader import advance_shared, session_cache
+
+def top_k(scores, k, largest=True):
+    """The k highest (or lowest) entries of a Series, in order, via partial selection"""
+    k = min(k, len(scores))
+    if k == 0:
+        return scores.iloc[:0]
+
+    keys = scores.to_numpy(dtype=float)
+    keys = -keys if largest else keys
+    # Missing scores never make the list ahead of real ones
+    keys = np.where(np.isnan(keys), np.inf, keys)
+
+    # argpartition is O(n); only the k winners get sorted
+    idx = np.argpartition(keys, k - 1)[:k]
+    idx = idx[np.argsort(keys[idx], kind='stable')]
+    return scores.iloc[idx]
+
+def mean_of_means(sums, counts):
+    """Average of each value column's per-entity mean"""
+    return sums.div(counts, axis=0).mean(axis=1)
+
+def delay_rate(sums, counts):
+    """Delayed share of all deliveries, in percent"""
+    total = sums['On-Time Deliveries'] + sums['Delayed Deliveries']
+    return sums['Delayed Deliveries'] / total * 100
+
+class StreamingTopK:
+    """Running per-entity totals that answer top-k queries as new rows arrive
+
+    update() costs O(rows) and top() costs O(entities), so rankings never
+    rescan history or fully sort the entity list.
+    """
+
+    def __init__(self, entity_col, value_cols, score=mean_of_means):
+        self.entity_col = entity_col
+        self.value_cols = list(value_cols)
+        self.score = score
+        self.sums = pd.DataFrame(columns=self.value_cols, dtype=float)
+        self.counts = pd.Series(dtype=float)
+
+    def update(self, rows):
+        """Fold a batch of new rows into the running totals"""
+        grouped = rows.groupby(self.entity_col)[self.value_cols]
+        sums, counts = grouped.sum().astype(float), grouped.size().astype(float)
+        if self.counts.empty:
+            # Nothing to align with yet; also keeps a multi-column entity key intact
+            self.sums, self.counts = sums, counts
+        else:
+            self.sums = self.sums.add(sums, fill_value=0)
+            self.counts = self.counts.add(counts, fill_value=0)
+        return self
+
+    def means(self):
+        """Per-entity mean of every value column"""
+        return self.sums.div(self.counts, axis=0)
+
+    def scores(self):
+        return self.score(self.sums, self.counts)
+
+    def top(self, k, largest=True):
+        return top_k(self.scores(), k, largest)
+
+def warehouse_ranking(warehouse_data):
+    """Warehouses scored by their average load and unload time"""
+    return StreamingTopK(
+        'Warehouse ID',
+        ['Average Load Time (mins)', 'Average Unload Time (mins)']
+    ).update(warehouse_data)
+
+def region_ranking(delivery_data):
+    """Regions scored by delay rate"""
+    return StreamingTopK(
+        'Region',
+        ['On-Time Deliveries', 'Delayed Deliveries'],
+        score=delay_rate
+    ).update(delivery_data)
+
+def shift_ranking(shift_data, by=('Date', 'Shift Type')):
+    """Individual shifts (one per date and shift type) scored by idle time"""
+    return StreamingTopK(list(by), ['Idle Time (hours)']).update(shift_data)
+
+def _advance(ranking, rows):
+    return ranking.update(rows)
+
+def _load_ranking(name, build, df):
+    """Ranking of df, fed only each data version's new rows"""
+    return session_cache(name, advance_shared, name, build, _advance, df)
+
+def load_warehouse_ranking(warehouse_data):
+    return _load_ranking('warehouse_ranking', warehouse_ranking, warehouse_data)
+
+def load_region_ranking(delivery_data):
+    return _load_ranking('region_ranking', region_ranking, delivery_data)
+
+def load_shift_ranking(shift_data):
+    return _load_ranking('shift_ranking', shift_ranking, shift_data)
@@ -0,0 +1,152 @@
+from functools import partial
+import numpy as np
+import pandas as pd
+from utils.data_loader import advance_shared, session_cache
+
+# Months counted as peak season
+PEAK_MONTHS = (11, 12)
+# Ridge penalty on the standardized coefficients
+RIDGE_PENALTY = 1e-3
+# Daily drivers joined onto each (Date, Region) delivery row
+DRIVERS = ['Warehouse Load Time', 'Warehouse Unload Time', 'Night Shift Percentage', 'Shift Idle Time', 'Peak Season']
+# Impact bands on the absolute delay-rate change per standard deviation, in percentage points
+IMPACT_BINS = [0, 0.5, 1, 2, np.inf]
+IMPACT_LABELS = ['Low', 'Medium', 'High', 'Very High']
+
+def _daily_drivers(warehouse_data, shift_data):
+    """One row per date with the warehouse and shift conditions of that day"""
+    warehouse = warehouse_data.groupby('Date')[['Average Load Time (mins)', 'Average Unload Time (mins)']].mean()
+    deliveries = shift_data.pivot_table(
+        index='Date', columns='Shift Type', values='Average Deliveries per Shift', aggfunc='sum'
+    ).reindex(columns=['Day Shift', 'Night Shift'], fill_value=0)
+    return pd.DataFrame({
+        'Warehouse Load Time': warehouse['Average Load Time (mins)'],
+        'Warehouse Unload Time': warehouse['Average Unload Time (mins)'],
+        'Night Shift Percentage': deliveries['Night Shift'] / deliveries.sum(axis=1) * 100,
+        'Shift Idle Time': shift_data.groupby('Date')['Idle Time (hours)'].mean()
+    })
+
+def build_features(delivery_data, warehouse_data, shift_data, regions):
+    """Design matrix rows per (Date, Region): drivers, region indicators, delay rate and weight
+
+    The first region is the baseline and gets no indicator, since the model
+    already has an intercept.
+    """
+    rows = delivery_data[['Date', 'Region', 'On-Time Deliveries', 'Delayed Deliveries']].dropna()
+    rows = rows.join(_daily_drivers(warehouse_data, shift_data), on='Date')
+    rows['Month'] = rows['Date'].dt.to_period('M').astype(str)
+    # Days without warehouse or shift records take their month's average
+    for col in DRIVERS[:-1]:
+        rows[col] = rows[col].fillna(rows.groupby('Month')[col].transform('mean'))
+    rows['Peak Season'] = rows['Date'].dt.month.isin(PEAK_MONTHS).astype(float)
+    for region in regions[1:]:
+        rows[f'{region} Region'] = (rows['Region'] == region).astype(float)
+    rows['Weight'] = rows['On-Time Deliveries'] + rows['Delayed Deliveries']
+    rows['Delay Rate'] = rows['Delayed Deliveries'] / rows['Weight']
+    return rows[rows['Weight'] > 0].dropna(subset=DRIVERS)
+
+class DelayRiskModel:
+    """Weighted ridge regression of delay rate on daily drivers and region
+
+    Only per-month sufficient statistics (weighted sums of x, y, xx' and xy)
+    are kept, so new months are folded in without revisiting old ones and
+    refitting is a single small solve.
+    """
+
+    def __init__(self, regions):
+        self.regions = list(regions)
+        # The other regions are measured against the first
+        self.baseline = self.regions[0] if self.regions else None
+        self.features = DRIVERS + [f'{region} Region' for region in self.regions[1:]]
+        self.months = {}
+        self.coef = None
+        self.intercept = 0.0
+        self.means = None
+        self.stds = None
+        self.r_squared = float('nan')
+
+    def _month_stats(self, rows):
+        x = rows[self.features].to_numpy(dtype=float)
+        y = rows['Delay Rate'].to_numpy(dtype=float)
+        w = rows['Weight'].to_numpy(dtype=float)
+        xw = x * w[:, None]
+        return np.array([w.sum(), w @ y, w @ (y * y)]), xw.sum(axis=0), xw.T @ x, xw.T @ y
+
+    def update(self, rows):
+        """Replace the statistics of every month present in rows, then refit"""
+        for month, group in rows.groupby('Month'):
+            self.months[month] = self._month_stats(group)
+        self.fit()
+
+    def fit(self):
+        if not self.months:
+            return
+        scalars, sx, sxx, sxy = (sum(parts) for parts in zip(*self.months.values()))
+        total, sy, syy = scalars
+        self.means = sx / total
+        cov = sxx / total - np.outer(self.means, self.means)
+        cov_xy = sxy / total - self.means * (sy / total)
+        var = np.clip(np.diag(cov), 1e-12, None)
+        self.stds = np.sqrt(var)
+        self.coef = np.linalg.solve(cov + RIDGE_PENALTY * np.diag(var), cov_xy)
+        self.intercept = sy / total - self.means @ self.coef
+        var_y = syy / total - (sy / total) ** 2
+        explained = self.coef @ cov_xy * 2 - self.coef @ cov @ self.coef
+        self.r_squared = explained / var_y if var_y > 0 else float('nan')
+
+    def predict(self, x):
+        """Delay rate for each row of a feature matrix, in one matrix product"""
+        return x @ self.coef + self.intercept
+
+    def contributions(self):
+        """Change in delay rate (percentage points) per standard deviation of each factor"""
+        return pd.Series(self.coef * self.stds * 100, index=self.features, name='Risk Score')
+
+    def score(self, rows):
+        """Predicted and actual delay rate (%) per (Region, Month), scored in a single batch"""
+        weighted = rows[self.features].mul(rows['Weight'], axis=0)
+        weighted[['Weight', 'Delayed Deliveries']] = rows[['Weight', 'Delayed Deliveries']]
+        groups = weighted.groupby([rows['Region'], rows['Month']]).sum()
+        x = groups[self.features].div(groups['Weight'], axis=0).to_numpy()
+        return pd.DataFrame({
+            'Predicted Delay Rate': self.predict(x) * 100,
+            'Actual Delay Rate': groups['Delayed Deliveries'] / groups['Weight'] * 100
+        }, index=groups.index).reset_index()
+
+def impact_levels(risk_scores):
+    """Impact band of each factor from the absolute size of its risk score"""
+    return pd.cut(risk_scores.abs(), IMPACT_BINS, labels=IMPACT_LABELS, include_lowest=True).astype(str)
+
+def fit_delay_risk(rows, regions, *frames):
+    """Fit a fresh model on every feature row"""
+    model = DelayRiskModel(regions)
+    model.update(rows)
+    return model
+
+def refit_new_months(rows, regions, model, *new_rows):
+    """Refresh the statistics of every month the new rows fall in
+
+    Features only mix rows of the same month, so a month's statistics are
+    recomputed from all of its rows and the others are left as they are.
+    """
+    if model.regions != regions:
+        return fit_delay_risk(rows, regions)
+    months = set()
+    for frame in new_rows:
+        months.update(frame['Date'].dt.to_period('M').astype(str))
+    model.update(rows[rows['Month'].isin(months)])
+    return model
+
+def advance_delay_risk(delivery_data, warehouse_data, shift_data):
+    """Fold the data into the shared model; returns it and the per-(Region, Month) scores"""
+    regions = sorted(delivery_data['Region'].dropna().unique())
+    rows = build_features(delivery_data, warehouse_data, shift_data, regions)
+    model = advance_shared(
+        'delay_risk', partial(fit_delay_risk, rows, regions), partial(refit_new_months, rows, regions),
+        delivery_data, warehouse_data, shift_data
+    )
+    return model, model.score(rows)
+
+def load_delay_risk(delivery_data, warehouse_data, shift_data):
+    """Fitted model and per-(Region, Month) scores, refreshed once per data version"""
+    return session_cache('delay_risk', advance_delay_risk, delivery_data, warehouse_data, shift_data)
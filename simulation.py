@@ -0,0 +1,117 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from utils.data_loader import session_cache
+
+SIM_TRIALS = 2000
+SIM_DOCKS = 2
+# Simulated window per trial, in minutes
+SIM_HORIZON_MINS = 24 * 60
+# Trial-warehouse-truck cells above which trials are split across a process pool
+POOL_MIN_CELLS = 5_000_000
+
+class EmpiricalTimes:
+    """Observed (load, unload) pairs per warehouse, padded into dense arrays"""
+
+    def __init__(self, warehouse_data):
+        rows = warehouse_data.dropna(subset=['Warehouse ID', 'Average Load Time (mins)', 'Average Unload Time (mins)'])
+        codes, self.warehouses = pd.factorize(rows['Warehouse ID'], sort=True)
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        self.counts = np.bincount(codes, minlength=len(self.warehouses))
+        # Position of each row within its warehouse
+        slots = np.arange(len(codes)) - np.repeat(np.cumsum(self.counts) - self.counts, self.counts)
+        self.load = np.zeros((len(self.warehouses), self.counts.max()))
+        self.unload = np.zeros_like(self.load)
+        self.load[codes, slots] = rows['Average Load Time (mins)'].to_numpy(dtype=float)[order]
+        self.unload[codes, slots] = rows['Average Unload Time (mins)'].to_numpy(dtype=float)[order]
+
+    def mean_service(self):
+        return (self.load + self.unload).sum(axis=1) / self.counts
+
+def simulate_docks(times, trucks_per_day, load_factor=1.0, unload_factor=1.0,
+                   docks=SIM_DOCKS, trials=SIM_TRIALS, seed=0):
+    """Simulate a day of FIFO dock queues at every warehouse, for all trials at once
+
+    Trucks arrive as a Poisson process; each is served by the first free
+    dock for a load plus unload time resampled from its warehouse's
+    history and scaled by the per-warehouse factors. Trials and warehouses
+    are vectorized; only the trucks are stepped through in arrival order.
+    The same seed gives the same arrivals and samples, so scenarios can be
+    compared against a baseline with common random numbers.
+    Returns per-(trial, warehouse) mean waiting minutes, completed trucks and
+    dock utilization, plus each truck's wait (NaN for trucks past the horizon).
+    """
+    rng = np.random.default_rng(seed)
+    n_warehouses = len(times.warehouses)
+    rate = np.broadcast_to(np.asarray(trucks_per_day, dtype=float), (n_warehouses,)) / SIM_HORIZON_MINS
+    # Enough trucks that running past the horizon is all but certain
+    expected = float(np.max(rate)) * SIM_HORIZON_MINS
+    max_trucks = int(np.ceil(expected + 6 * np.sqrt(expected) + 1))
+
+    gaps = rng.exponential(1.0, (trials, n_warehouses, max_trucks)) / rate[:, None]
+    arrivals = np.cumsum(gaps, axis=-1)
+    rows = np.floor(rng.random((trials, n_warehouses, max_trucks)) * times.counts[:, None]).astype(int)
+    warehouse_idx = np.arange(n_warehouses)[:, None]
+    service = (
+        times.load[warehouse_idx, rows] * np.asarray(load_factor, dtype=float).reshape(-1, 1)
+        + times.unload[warehouse_idx, rows] * np.asarray(unload_factor, dtype=float).reshape(-1, 1)
+    )
+
+    free_at = np.zeros((trials, n_warehouses, docks))
+    waits = np.zeros((trials, n_warehouses, max_trucks))
+    finish = np.zeros_like(waits)
+    for truck in range(max_trucks):
+        dock = np.argmin(free_at, axis=-1)[..., None]
+        start = np.maximum(arrivals[..., truck], np.take_along_axis(free_at, dock, axis=-1)[..., 0])
+        waits[..., truck] = start - arrivals[..., truck]
+        finish[..., truck] = start + service[..., truck]
+        np.put_along_axis(free_at, dock, finish[..., truck, None], axis=-1)
+
+    arrived = arrivals < SIM_HORIZON_MINS
+    served = arrived & (finish <= SIM_HORIZON_MINS)
+    busy = np.clip(np.minimum(finish, SIM_HORIZON_MINS) - (finish - service), 0, None) * arrived
+    return {
+        'wait': (waits * arrived).sum(axis=-1) / np.maximum(arrived.sum(axis=-1), 1),
+        'truck_wait': np.where(arrived, waits, np.nan),
+        'throughput': served.sum(axis=-1),
+        'utilization': busy.sum(axis=-1) / (docks * SIM_HORIZON_MINS)
+    }
+
+def _simulate_chunk(args):
+    times, trucks_per_day, load_factor, unload_factor, docks, trials, seed = args
+    return simulate_docks(times, trucks_per_day, load_factor, unload_factor, docks, trials, seed)
+
+def simulate_pooled(times, trucks_per_day, load_factor=1.0, unload_factor=1.0,
+                    docks=SIM_DOCKS, trials=SIM_TRIALS, seed=0, workers=None):
+    """simulate_docks, with large runs split into trial batches across processes"""
+    cells = trials * len(times.warehouses) * max(1, int(np.max(trucks_per_day)))
+    if cells < POOL_MIN_CELLS:
+        return simulate_docks(times, trucks_per_day, load_factor, unload_factor, docks, trials, seed)
+    workers = workers or os.cpu_count() or 1
+    batches = [
+        (times, trucks_per_day, load_factor, unload_factor, docks, len(batch), seed * 1000 + i)
+        for i, batch in enumerate(np.array_split(np.arange(trials), workers))
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_simulate_chunk, batches))
+    return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+def p95_wait(result, axis=None):
+    """95th percentile of the individual truck waits, over all trials"""
+    return np.nanpercentile(result['truck_wait'], 95, axis=axis)
+
+def summarize(times, result):
+    """Mean and 95th-percentile truck wait, throughput and utilization per warehouse"""
+    return pd.DataFrame({
+        'Mean Wait (mins)': np.nanmean(result['truck_wait'], axis=(0, 2)),
+        'P95 Wait (mins)': p95_wait(result, axis=(0, 2)),
+        'Trucks per Day': result['throughput'].mean(axis=0),
+        'Dock Utilization (%)': result['utilization'].mean(axis=0) * 100
+    }, index=pd.Index(times.warehouses, name='Warehouse ID'))
+
+def load_empirical_times(warehouse_data):
+    """Per-warehouse service-time samples, built once per data version"""
+    return session_cache('empirical_times', EmpiricalTimes, warehouse_data)
@@ -0,0 +1,196 @@
+from functools import partial
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from utils.data_loader import advance_shared, session_cache
+
+# Accuracy parameter; at most about 3 * SKETCH_K items are kept however many rows arrive
+SKETCH_K = 200
+# Grid resolution of the violin outline
+VIOLIN_POINTS = 60
+
+class KLLSketch:
+    """Mergeable KLL quantile sketch
+
+    Level h holds items of weight 2**h. When a level outgrows its capacity it
+    is sorted and every other item (random offset) is promoted to the next
+    level, so memory stays O(k) and two sketches merge by concatenating levels.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.total = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                # An odd item out stays behind at its current weight
+                cut = len(items) - len(items) % 2
+                leftover, items = items[cut:], items[:cut]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = leftover
+            level += 1
+
+    def update(self, values):
+        """Add a batch of values"""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.count += values.size
+        self.total += values.sum()
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch (e.g. from a different data chunk) into this one"""
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Approximate values at the given quantiles (0 and 1 are exact)"""
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, weights = values[order], weights[order]
+        # Each retained item sits at the midpoint of the rank range it stands for
+        positions = (np.cumsum(weights) - weights / 2) / weights.sum()
+        positions = np.concatenate([[0.0], positions, [1.0]])
+        values = np.concatenate([[self.min], values, [self.max]])
+        return np.interp(qs, positions, values)
+
+    def box_stats(self):
+        """Quartiles, Tukey whiskers and mean for a precomputed box plot"""
+        q1, median, q3 = self.quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        return {
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'lowerfence': max(self.min, q1 - 1.5 * iqr),
+            'upperfence': min(self.max, q3 + 1.5 * iqr),
+            'mean': self.total / self.count
+        }
+
+def group_sketches(df, group_col, value_col):
+    """One sketch per group of value_col"""
+    return {
+        group: KLLSketch().update(values.to_numpy())
+        for group, values in df.groupby(group_col)[value_col]
+    }
+
+def column_sketches(df, columns):
+    """One sketch per column"""
+    return {col: KLLSketch().update(df[col].to_numpy()) for col in columns}
+
+def merge_group_sketches(sketches, rows, group_col, value_col):
+    """Sketch each group's new rows and merge them in, adding groups not seen before"""
+    for group, sketch in group_sketches(rows, group_col, value_col).items():
+        if group in sketches:
+            sketches[group].merge(sketch)
+        else:
+            sketches[group] = sketch
+    return sketches
+
+def merge_column_sketches(sketches, rows, columns):
+    """Sketch each column's new rows and merge them in"""
+    for col, sketch in column_sketches(rows, columns).items():
+        sketches[col].merge(sketch)
+    return sketches
+
+def load_group_sketches(name, df, group_col, value_col):
+    """Per-group sketches; each data version's new rows are sketched and merged in"""
+    name = f'sketches_{name}'
+    build = partial(group_sketches, group_col=group_col, value_col=value_col)
+    update = partial(merge_group_sketches, group_col=group_col, value_col=value_col)
+    return session_cache(name, advance_shared, name, build, update, df)
+
+def load_column_sketches(name, df, columns):
+    """Per-column sketches; each data version's new rows are sketched and merged in"""
+    name = f'sketches_{name}'
+    build = partial(column_sketches, columns=columns)
+    update = partial(merge_column_sketches, columns=columns)
+    return session_cache(name, advance_shared, name, build, update, df)
+
+def _box_trace(name, stats, color, x=None, width=None):
+    return go.Box(
+        name=str(name),
+        x=[name if x is None else x],
+        q1=[stats['q1']],
+        median=[stats['median']],
+        q3=[stats['q3']],
+        lowerfence=[stats['lowerfence']],
+        upperfence=[stats['upperfence']],
+        mean=[stats['mean']],
+        marker_color=color,
+        width=width
+    )
+
+def sketch_box(sketches, title, x_label, y_label):
+    """Box plot drawn from sketch summaries instead of raw values"""
+    colors = px.colors.qualitative.Plotly
+    fig = go.Figure([
+        _box_trace(name, sketch.box_stats(), colors[i % len(colors)])
+        for i, (name, sketch) in enumerate(sketches.items())
+    ])
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label, legend_title=x_label)
+    return fig
+
+def sketch_violin(sketches, title, x_label, y_label):
+    """Violin outline from each sketch's CDF, with a precomputed box inside"""
+    colors = px.colors.qualitative.Plotly
+    qs = np.linspace(0, 1, VIOLIN_POINTS + 1)
+    fig = go.Figure()
+
+    for i, (name, sketch) in enumerate(sketches.items()):
+        color = colors[i % len(colors)]
+        grid = np.linspace(sketch.min, sketch.max, VIOLIN_POINTS)
+        # Density is the slope of the sketch CDF, lightly smoothed
+        cdf = np.interp(grid, sketch.quantiles(qs), qs)
+        density = np.convolve(np.gradient(cdf, grid), np.array([1, 2, 3, 2, 1]) / 9, mode='same')
+        half_width = 0.4 * density / density.max() if density.max() > 0 else density
+
+        fig.add_trace(go.Scatter(
+            x=np.concatenate([i - half_width, (i + half_width)[::-1]]),
+            y=np.concatenate([grid, grid[::-1]]),
+            fill='toself',
+            mode='lines',
+            line_color=color,
+            name=str(name),
+            hoverinfo='skip'
+        ))
+        fig.add_trace(_box_trace(name, sketch.box_stats(), color, x=i, width=0.1))
+        fig.data[-1].showlegend = False
+
+    fig.update_layout(
+        title=title,
+        xaxis=dict(title=x_label, tickvals=list(range(len(sketches))), ticktext=[str(name) for name in sketches]),
+        yaxis_title=y_label,
+        legend_title=x_label
+    )
+    return fig
@@ -0,0 +1,155 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from utils.data_loader import session_cache
+from utils.validation import SHIFT_HOURS
+
+SHIFT_TYPES = ['Day Shift', 'Night Shift']
+# Share of each shift's demand that may be served by the other shift instead
+FLEX_SHARE = 0.2
+# Crew-hours are rostered in blocks of this many hours
+STAFF_BLOCK_HOURS = 1
+FORECAST_DAYS = 365
+# Problems with more depot-days than this are split across a process pool
+POOL_MIN_CELLS = 2_000_000
+
+def shift_rates(shift_data):
+    """Deliveries per productive crew-hour for each shift type"""
+    shift = shift_data.dropna(subset=['Average Deliveries per Shift', 'Idle Time (hours)'])
+    totals = shift.groupby('Shift Type').agg(
+        deliveries=('Average Deliveries per Shift', 'sum'),
+        idle=('Idle Time (hours)', 'sum'),
+        shifts=('Idle Time (hours)', 'size')
+    ).reindex(SHIFT_TYPES)
+    return (totals['deliveries'] / (totals['shifts'] * SHIFT_HOURS - totals['idle'])).to_numpy()
+
+def idle_rates(shift_data):
+    """Observed share of staffed hours spent idle for each shift type"""
+    shift = shift_data.dropna(subset=['Idle Time (hours)'])
+    idle = shift.groupby('Shift Type')['Idle Time (hours)'].mean().reindex(SHIFT_TYPES)
+    return (idle / SHIFT_HOURS).to_numpy()
+
+def night_share(shift_data):
+    """Night shift's share of daily deliveries, per weekday (Monday first)"""
+    daily = shift_data.pivot_table(
+        index='Date', columns='Shift Type', values='Average Deliveries per Shift', aggfunc='sum'
+    ).reindex(columns=SHIFT_TYPES, fill_value=0)
+    share = daily['Night Shift'] / daily.sum(axis=1)
+    by_weekday = share.groupby(share.index.dayofweek).mean()
+    return by_weekday.reindex(range(7)).fillna(share.mean()).to_numpy()
+
+def forecast_demand(delivery_data, days=FORECAST_DAYS):
+    """Daily deliveries per region for the next `days` days
+
+    Each region's level is its mean daily volume per calendar month (falling
+    back to its overall mean), scaled by a network-wide weekday profile.
+    Returns the forecast dates, region names and a (regions, days) array.
+    """
+    delivery = delivery_data.dropna(subset=['Date', 'Region'])
+    volume = delivery['On-Time Deliveries'].fillna(0) + delivery['Delayed Deliveries'].fillna(0)
+    daily = volume.groupby([delivery['Region'], delivery['Date']]).sum().reset_index(name='Deliveries')
+    regions = sorted(daily['Region'].unique())
+    region_codes = pd.Index(regions).get_indexer(daily['Region'])
+    months = daily['Date'].dt.month.to_numpy() - 1
+
+    # Mean volume per (region, month) in one pass of bincounts
+    cells = region_codes * 12 + months
+    totals = np.bincount(cells, weights=daily['Deliveries'], minlength=len(regions) * 12)
+    counts = np.bincount(cells, minlength=len(regions) * 12)
+    overall = np.bincount(region_codes, weights=daily['Deliveries'], minlength=len(regions)) / np.bincount(region_codes, minlength=len(regions))
+    level = np.where(counts > 0, totals / np.maximum(counts, 1), np.repeat(overall, 12)).reshape(len(regions), 12)
+
+    weekday = daily.groupby(daily['Date'].dt.dayofweek)['Deliveries'].mean()
+    weekday = (weekday / daily['Deliveries'].mean()).reindex(range(7)).fillna(1.0).to_numpy()
+
+    dates = pd.date_range(daily['Date'].max() + pd.Timedelta(days=1), periods=days, freq='D')
+    demand = level[:, dates.month - 1] * weekday[dates.dayofweek]
+    return dates, regions, demand
+
+def _blocks(hours):
+    """Hours rounded up to whole rostering blocks"""
+    return np.ceil(hours / STAFF_BLOCK_HOURS - 1e-9) * STAFF_BLOCK_HOURS
+
+def busy_hours(day_served, night_served, rates):
+    """Crew-hours the served deliveries keep busy, each shift at its own rate"""
+    return day_served / rates[0] + night_served / rates[1]
+
+def solve_staffing(day_demand, night_demand, rates, flex=FLEX_SHARE):
+    """Fewest crew-hours per shift covering demand, for every depot-day at once
+
+    A crew-hour on either shift serves that shift's `rate` deliveries, and
+    hours are rostered in STAFF_BLOCK_HOURS blocks. Up to `flex` of each
+    shift's demand may move to the other shift. The integer problem per
+    depot-day has one free variable (day hours) over a short range, so all
+    candidates are evaluated in a single broadcast and the one with the
+    fewest crew-hours is picked with argmin. Returns (day hours, night
+    hours, idle hours).
+    """
+    rates = np.asarray(rates)
+    lo = _blocks(day_demand * (1 - flex) / rates[0])
+    hi = _blocks((day_demand + flex * night_demand) / rates[0])
+    steps = int(np.round((hi - lo).max() / STAFF_BLOCK_HOURS)) + 1
+    candidates = np.minimum(lo[..., None] + np.arange(steps) * STAFF_BLOCK_HOURS, hi[..., None])
+
+    day = day_demand[..., None]
+    night = night_demand[..., None]
+    # Day hours serve their own demand first, then flexible night demand
+    served_day = np.clip(candidates * rates[0], day * (1 - flex), day + flex * night)
+    night_hours = _blocks((day + night - served_day) / rates[1])
+
+    best = np.argmin(candidates + night_hours, axis=-1)[..., None]
+    day_hours, night_hours, served_day = (
+        np.take_along_axis(values, best, axis=-1)[..., 0] for values in (candidates, night_hours, served_day)
+    )
+    busy = busy_hours(served_day, day_demand + night_demand - served_day, rates)
+    return day_hours, night_hours, day_hours + night_hours - busy
+
+def _solve_chunk(args):
+    return solve_staffing(*args)
+
+def solve_staffing_pooled(day_demand, night_demand, rates, flex=FLEX_SHARE, workers=None):
+    """solve_staffing, with large problems split by depot across processes"""
+    if day_demand.size < POOL_MIN_CELLS:
+        return solve_staffing(day_demand, night_demand, rates, flex)
+    workers = workers or os.cpu_count() or 1
+    chunks = [
+        (day, night, rates, flex)
+        for day, night in zip(np.array_split(day_demand, workers), np.array_split(night_demand, workers))
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_solve_chunk, chunks))
+    return tuple(np.concatenate(values) for values in zip(*parts))
+
+def observed_staffing(day_demand, night_demand, rates, idle_share):
+    """Baseline: crew-hours each shift needs at its observed idle rate, with no flex"""
+    busy_day = day_demand / rates[0]
+    busy_night = night_demand / rates[1]
+    day_hours = busy_day / (1 - idle_share[0])
+    night_hours = busy_night / (1 - idle_share[1])
+    return day_hours, night_hours, day_hours + night_hours - busy_day - busy_night
+
+def build_schedule(delivery_data, shift_data, flex=FLEX_SHARE):
+    """Forecast a year of demand per region and solve its demand-based staffing"""
+    dates, regions, demand = forecast_demand(delivery_data)
+    rates = shift_rates(shift_data)
+    night = demand * night_share(shift_data)[dates.dayofweek]
+    day = demand - night
+
+    day_hours, night_hours, idle = solve_staffing_pooled(day, night, rates, flex)
+    _, _, baseline_idle = observed_staffing(day, night, rates, idle_rates(shift_data))
+
+    return pd.DataFrame({
+        'Date': np.tile(dates, len(regions)),
+        'Region': np.repeat(regions, len(dates)),
+        'Demand': demand.ravel(),
+        'Day Crew-Hours': day_hours.ravel(),
+        'Night Crew-Hours': night_hours.ravel(),
+        'Idle Hours': idle.ravel(),
+        'Baseline Idle Hours': baseline_idle.ravel()
+    })
+
+def load_schedule(delivery_data, shift_data, flex=FLEX_SHARE):
+    """Demand-based schedule, solved once per data version and flex share"""
+    return session_cache(f'staffing_schedule_{flex:.2f}', build_schedule, delivery_data, shift_data, flex)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+from utils.staffing import build_schedule, observed_staffing, solve_staffing
+
+@pytest.mark.parametrize('flex', [0.0, 0.2, 0.5])
+def test_solved_hours_cover_demand(flex):
+    rng = np.random.default_rng(0)
+    day = rng.uniform(50, 900, (50, 120))
+    night = rng.uniform(20, 600, (50, 120))
+    rates = np.array([9.0, 6.5])
+
+    day_hours, night_hours, idle = solve_staffing(day, night, rates, flex)
+
+    assert (idle >= -1e-9).all()
+    # Every depot-day's demand is covered, with each shift moving at most flex of the other's
+    assert (day_hours * rates[0] + night_hours * rates[1] >= day + night - 1e-6).all()
+    assert (day_hours * rates[0] >= day * (1 - flex) - 1e-6).all()
+    assert (night_hours * rates[1] >= night * (1 - flex) - 1e-6).all()
+
+def test_flex_never_adds_hours():
+    rng = np.random.default_rng(1)
+    day = rng.uniform(50, 900, (20, 60))
+    night = rng.uniform(20, 600, (20, 60))
+    rates = np.array([9.0, 6.5])
+
+    fixed_day, fixed_night, _ = solve_staffing(day, night, rates, 0.0)
+    flex_day, flex_night, _ = solve_staffing(day, night, rates, 0.5)
+
+    assert (flex_day + flex_night <= fixed_day + fixed_night + 1e-9).all()
+    assert (flex_day + flex_night < fixed_day + fixed_night).any()
+
+def test_baseline_idle_matches_observed_rates():
+    day = np.array([[180.0, 90.0]])
+    night = np.array([[130.0, 65.0]])
+    rates = np.array([18.0, 13.0])
+    idle_share = np.array([0.25, 0.5])
+
+    day_hours, night_hours, idle = observed_staffing(day, night, rates, idle_share)
+
+    np.testing.assert_allclose(day_hours, [[40 / 3, 20 / 3]])
+    np.testing.assert_allclose(night_hours, [[20.0, 10.0]])
+    np.testing.assert_allclose(idle, [[40 / 3, 20 / 3]])
+
+@pytest.mark.parametrize('flex', [0.0, 0.2, 0.5])
+def test_schedule_beats_observed_idle_on_real_data(flex):
+    delivery = pd.read_csv('delivery_performance_data.csv', parse_dates=['Date'])
+    shift = pd.read_csv('shift_performance_data.csv', parse_dates=['Date'])
+    schedule = build_schedule(delivery, shift, flex)
+
+    assert schedule['Idle Hours'].sum() < schedule['Baseline Idle Hours'].sum()
+    # Staffing follows demand rather than sitting at one fixed size
+    hours = schedule['Day Crew-Hours'] + schedule['Night Crew-Hours']
+    assert hours.nunique() > 1
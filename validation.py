@@ -0,0 +1,70 @@
+import pandas as pd
+
+SHIFT_HOURS = 8
+
+# Column holding each dataset's date
+DATE_COLS = {
+    'cost': 'Month',
+    'delivery': 'Date',
+    'warehouse': 'Date',
+    'shift': 'Date'
+}
+
+# Columns expected to identify one record; rows sharing them are kept but reported
+KEY_COLS = {
+    'cost': ['Month'],
+    'delivery': ['Date', 'Region'],
+    'warehouse': ['Date', 'Warehouse ID'],
+    'shift': ['Date', 'Shift Type']
+}
+
+# Numeric columns, all of which must be non-negative
+VALUE_COLS = {
+    'cost': ['Fuel Cost', 'Maintenance Cost'],
+    'delivery': ['On-Time Deliveries', 'Delayed Deliveries'],
+    'warehouse': ['Average Load Time (mins)', 'Average Unload Time (mins)'],
+    'shift': ['Average Deliveries per Shift', 'Idle Time (hours)']
+}
+
+# Upper bounds on top of the non-negative check
+MAX_VALUES = {
+    'shift': {'Idle Time (hours)': SHIFT_HOURS}
+}
+
+def validate(dataset, df):
+    """Split a raw frame into clean rows, quarantined rows and a per-check summary"""
+    df = df.copy()
+    checks = {}
+
+    date_col = DATE_COLS[dataset]
+    df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
+    checks[f'unparseable {date_col}'] = df[date_col].isna()
+
+    for col in VALUE_COLS[dataset]:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+        checks[f'missing or non-numeric {col}'] = df[col].isna()
+        checks[f'negative {col}'] = df[col] < 0
+
+    for col, limit in MAX_VALUES.get(dataset, {}).items():
+        checks[f'{col} above {limit}'] = df[col] > limit
+
+    # Only exact repeats are dropped: the sources hold several distinct rows
+    # per key (e.g. two readings for one region and day), so a key collision
+    # is reported without removing either row
+    checks['exact duplicate row'] = df.duplicated()
+
+    failed = pd.DataFrame(checks, index=df.index)
+    bad = failed.any(axis=1)
+    collisions = df[~bad].duplicated(subset=KEY_COLS[dataset], keep=False)
+
+    quarantine = df[bad].copy()
+    # Boolean matrix times labels gives each row's failed checks as one string
+    quarantine['Reason'] = failed[bad].dot(failed.columns + '; ').str.rstrip('; ')
+
+    report = pd.DataFrame({
+        'Dataset': dataset,
+        'Check': list(failed.columns) + ['repeated ' + ' + '.join(KEY_COLS[dataset])],
+        'Rows': list(failed.sum().values) + [int(collisions.sum())],
+        'Action': ['quarantined'] * len(failed.columns) + ['kept']
+    })
+    return df[~bad].reset_index(drop=True), quarantine, report